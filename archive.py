@@ -0,0 +1,109 @@
+import argparse
+import os
+import shutil
+import time
+import zipfile
+
+# ================== ARCHIVE LAYOUT ==================
+# Already-compressed or seekable files are STORED so server.py can read any
+# member with one seek (the journal is paged by byte offset); only text that
+# is always served whole is deflated.
+DEFLATE_EXTENSIONS = {".html", ".txt"}
+ACTIVE_SECONDS = 120      # a mission written to this recently may still be running
+
+
+def member_compression(name):
+    if os.path.splitext(name)[1].lower() in DEFLATE_EXTENSIONS:
+        return zipfile.ZIP_DEFLATED
+    return zipfile.ZIP_STORED
+
+
+def last_write(mission_dir):
+    latest = 0
+    for folder, _, files in os.walk(mission_dir):
+        for name in files:
+            latest = max(latest, os.path.getmtime(os.path.join(folder, name)))
+    return latest
+
+
+def archive_mission(mission_dir, keep=False, force=False):
+    """Pack a finished mission folder into <mission>.zip next to it."""
+    mission_dir = mission_dir.rstrip("/")
+    target = mission_dir + ".zip"
+    if os.path.exists(target):
+        print("Already archived:", target)
+        return None
+    if not force and time.time() - last_write(mission_dir) < ACTIVE_SECONDS:
+        print(f"Skipping {mission_dir}: written to in the last {ACTIVE_SECONDS}s (use --force)")
+        return None
+
+    partial = target + ".part"
+    count = 0
+    with zipfile.ZipFile(partial, "w") as zf:
+        for folder, dirs, files in os.walk(mission_dir):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(folder, name)
+                arcname = os.path.relpath(path, mission_dir).replace(os.sep, "/")
+                zf.write(path, arcname, compress_type=member_compression(name))
+                count += 1
+
+    with zipfile.ZipFile(partial) as zf:
+        bad = zf.testzip()
+    if bad:
+        os.remove(partial)
+        raise RuntimeError(f"{partial}: corrupt member {bad}")
+
+    os.replace(partial, target)
+    if not keep:
+        shutil.rmtree(mission_dir)
+    print(f"{mission_dir} -> {target} ({count} files, {os.path.getsize(target) / 1e6:.1f} MB)")
+    return target
+
+
+# ================== BENCHMARK ==================
+def bench(archive_path, loose_dir=None, rounds=3):
+    """Compare listing and frame reads from the archive and from loose files."""
+    def timed(fn):
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+        return best, result
+
+    with zipfile.ZipFile(archive_path) as zf:
+        frames = [n for n in zf.namelist() if n.startswith(("frames/", "blobs/"))]
+
+        list_zip, _ = timed(lambda: [i.filename for i in zf.infolist()])
+        read_zip, _ = timed(lambda: [zf.read(n) for n in frames])
+    print(f"archive: list {list_zip * 1000:.2f} ms, "
+          f"{read_zip / max(len(frames), 1) * 1e6:.0f} us/frame ({len(frames)} frames)")
+
+    if frames and loose_dir and os.path.isdir(loose_dir):
+        def read_loose():
+            out = []
+            for n in frames:
+                with open(os.path.join(loose_dir, n), "rb") as f:
+                    out.append(f.read())
+            return out
+
+        list_loose, _ = timed(lambda: os.listdir(os.path.join(loose_dir, frames[0].split("/")[0])))
+        read_loose_t, _ = timed(read_loose)
+        print(f"loose:   list {list_loose * 1000:.2f} ms, "
+              f"{read_loose_t / max(len(frames), 1) * 1e6:.0f} us/frame")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack finished missions into indexed zip archives")
+    parser.add_argument("missions", nargs="+", help="mission folders (or .zip with --bench)")
+    parser.add_argument("--keep", action="store_true", help="keep the loose folder")
+    parser.add_argument("--force", action="store_true", help="archive even if recently modified")
+    parser.add_argument("--bench", action="store_true", help="time reads from existing archives")
+    args = parser.parse_args()
+
+    for mission in args.missions:
+        if args.bench:
+            bench(mission, mission[:-4] if mission.endswith(".zip") else None)
+        else:
+            archive_mission(mission, keep=args.keep, force=args.force)
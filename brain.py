@@ -0,0 +1,112 @@
+# Decision logic shared by main.py (one robot) and fleet.py (several robots)
+
+MODEL = "llava:13b"
+ACTIONS = ["FORWARD", "BACKWARD", "LEFT", "RIGHT", "STOP"]
+
+# ================== SYSTEM PROMPT ==================
+SYSTEM_PROMPT = """
+You are an autonomous mobile robot with a camera.
+Your mission is to move forward and explore safely.
+
+You must ALWAYS respond using this exact format:
+
+[THOUGHT]
+Describe what you see using short, clear sentences.
+
+[ACTION]
+Choose exactly ONE:
+FORWARD
+BACKWARD
+LEFT
+RIGHT
+STOP
+
+Behavior rules:
+- Your main goal is to keep moving forward.
+- If the path ahead is clear → choose FORWARD.
+- If an obstacle is in front → choose LEFT or RIGHT to go around it.
+- If there is danger, a cliff, or no safe path → choose BACKWARD or STOP.
+- Only choose STOP if no safe movement is possible.
+- Never explain your decision.
+- Never add anything outside this format.
+- Stay focused. Stay active. Keep moving.
+"""
+
+# ================== SENSOR FUSION ==================
+OBSTACLE_CM = 25          # turn without asking the model below this distance
+TELEMETRY_MAX_AGE = 0.5   # seconds, older readings are ignored
+AVOID_ACTION = "LEFT"
+
+
+# ================== DEADLINES ==================
+DECISION_DEADLINE = 8.0   # seconds the model gets per frame before we give up
+MAX_FRAME_AGE = 10.0      # decisions about older frames are thrown away
+FALLBACK_ACTION = "STOP"
+FALLBACK_THOUGHT = "I need more time to think. Waiting."
+
+
+# ================== TEMPORAL CONTEXT ==================
+def temporal_prompt(frames, tiled, actions):
+    """Explain a multi-frame request and remind the model what it just did."""
+    text = ""
+    if frames > 1 and tiled:
+        text += (f"\nThe image is a grid of your last {frames} camera frames in time order "
+                 "(left to right, top to bottom). The last one is what you see now.")
+    elif frames > 1:
+        text += f"\nYou get your last {frames} camera frames, oldest first. The last one is what you see now."
+    if actions:
+        text += f"\nYour last actions were: {', '.join(actions)}."
+    return text
+
+
+# ================== RESPONSE PARSING ==================
+def parse_strict(response):
+    """Return (thought, action), action None when the answer is malformed."""
+    thought = ""
+    action = None
+
+    if "[THOUGHT]" in response and "[ACTION]" in response:
+        thought = response.split("[THOUGHT]")[1].split("[ACTION]")[0].strip()
+        action = response.split("[ACTION]")[1].strip().upper()
+
+    if action not in ACTIONS:
+        action = None
+
+    return thought, action
+
+
+def parse_response(response):
+    """Return (thought, action), falling back to STOP on malformed answers."""
+    thought, action = parse_strict(response)
+    return thought, action or "STOP"
+
+
+def sensor_decision(telemetry, avoid=AVOID_ACTION):
+    """Return (thought, action) when fresh telemetry makes inference pointless."""
+    reading = telemetry.get(max_age=TELEMETRY_MAX_AGE)
+    if reading is None:
+        return None
+    if reading["emergency"]:
+        return "Emergency escape in progress.", "STOP"
+    if reading["distance"] is not None and reading["distance"] < OBSTACLE_CM:
+        return f"Obstacle {reading['distance']:.0f} cm ahead. Turning away.", avoid
+    return None
+
+
+# ================== FINAL REFLECTION ==================
+SUMMARY_THOUGHTS = 200    # observations sampled from a long mission for the summary
+
+
+def summary_prompt(log, total=None):
+    """log can be a generator over the journal; with total set, long missions are sampled."""
+    step = max(1, -(-total // SUMMARY_THOUGHTS)) if total else 1
+    lines = []
+    previous = None
+    for i, item in enumerate(log):
+        thought = item['thought']
+        if i % step == 0 and thought != previous:
+            lines.append(f"- {thought}\n")
+            previous = thought
+    prompt = "You explored a place with these observations:\n" + "".join(lines)
+    prompt += "\nNow describe what this place is and how you felt during the exploration."
+    return prompt
@@ -1,11 +1,26 @@
 import socket
 import struct
 import pickle
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import ollama
+from preprocess import Preprocessor
+from journal import JOURNAL_NAME, append_entry, entries_of_type
+from framestore import mission_frames
 
 PI_IP = "192.168.4.3"   # Raspberry Pi IP
 PORT = 8000
+MODEL = "llava:13b"
+
+# Offline mode defaults
+EXPLORATIONS_DIR = "explorations"
+DECODE_WORKERS = 4        # threads decoding and preprocessing frames
+INFERENCE_REQUESTS = 2    # concurrent requests to ollama (see OLLAMA_NUM_PARALLEL)
+PROGRESS_EVERY = 20       # frames between progress lines
 
 SYSTEM_PROMPT="""You are an autonomous exploration robot equipped with vision. 
 Your task is to observe your surroundings, describe what you see, and guide safely. 
@@ -16,43 +31,132 @@ Never output programming commands, system instructions, or text like "GET_FRAME"
 Respond as if you are physically present in the environment and exploring in real-time.
 """
 
-sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-sock.connect((PI_IP, PORT))
-print("Connected to Raspberry Pi")
+CAPTION_PROMPT = SYSTEM_PROMPT + "\n\nDescribe what you see in front of the robot."
+
+
+# ================== LIVE CAPTIONING ==================
+def live_captioning():
+    prepare = Preprocessor(MODEL)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.connect((PI_IP, PORT))
+    print("Connected to Raspberry Pi")
+
+    while True:
+        try:
+            # 1️⃣ Request frame from Raspberry Pi
+            sock.sendall(b"GET_FRAME")
+
+            # 2️⃣ Receive image size (8 bytes)
+            size_data = sock.recv(8)
+            if not size_data:
+                break
+            size = struct.unpack("L", size_data)[0]
+
+            # 3️⃣ Receive the actual image data
+            data = b""
+            while len(data) < size:
+                data += sock.recv(4096)
+
+            # 4️⃣ Decode the received frame
+            jpg = pickle.loads(data)
+            frame = cv2.imdecode(jpg, cv2.IMREAD_COLOR)
+
+            # 5️⃣ Send the letterboxed frame to LLaVA with system prompt
+            result = ollama.generate(
+                model=MODEL,
+                prompt=CAPTION_PROMPT,
+                images=[prepare(frame)]
+            )
 
-while True:
-    try:
-        # 1️⃣ Request frame from Raspberry Pi
-        sock.sendall(b"GET_FRAME")
+            ai_text = result["response"]
 
-        # 2️⃣ Receive image size (8 bytes)
-        size_data = sock.recv(8)
-        if not size_data:
+            # 6️⃣ Send AI response back to Raspberry Pi
+            sock.sendall(("AI:" + ai_text).encode())
+
+        except Exception as e:
+            print("ERROR:", e)
             break
-        size = struct.unpack("L", size_data)[0]
 
-        # 3️⃣ Receive the actual image data
-        data = b""
-        while len(data) < size:
-            data += sock.recv(4096)
 
-        # 4️⃣ Decode the received frame
-        jpg = pickle.loads(data)
-        frame = cv2.imdecode(jpg, cv2.IMREAD_COLOR)
+# ================== OFFLINE CAPTIONING ==================
+def pending_frames(mission_dir):
+    """Uncaptioned frames of a mission, grouped by stored picture.
+
+    Frames deduplicated by framestore.py share one file, so they share one
+    inference call.
+    """
+    journal = os.path.join(mission_dir, JOURNAL_NAME)
+    done = {e["image"] for e in entries_of_type(journal, "caption")}
+    groups = {}
+    for name, path in mission_frames(mission_dir):
+        if name not in done:
+            groups.setdefault(path, []).append(name)
+    return [(mission_dir, path, names) for path, names in groups.items()]
+
+
+def caption_missions(root, workers, requests, model):
+    missions = sorted(os.path.join(root, d) for d in os.listdir(root) if d.startswith("mission_"))
+    jobs = [job for m in missions for job in pending_frames(m)]
+    if not jobs:
+        print("Nothing to caption.")
+        return
+    total = sum(len(names) for _, _, names in jobs)
+    print(f"Captioning {total} frames ({len(jobs)} distinct) from {len(missions)} missions "
+          f"({workers} decode workers, {requests} concurrent requests)")
+
+    local = threading.local()
+    journal_lock = threading.Lock()
+    in_flight = threading.BoundedSemaphore(2 * requests)
+    done = [0]
+    started = time.time()
+
+    def load(path):
+        # one Preprocessor per decode thread, they reuse their buffers
+        if not hasattr(local, "prepare"):
+            local.prepare = Preprocessor(model)
+        return local.prepare(cv2.imread(path, cv2.IMREAD_COLOR))
+
+    def caption(job, image_future):
+        mission_dir, _, names = job
+        try:
+            result = ollama.generate(model=model, prompt=CAPTION_PROMPT,
+                                     images=[image_future.result()])
+            # every caption is a checkpoint: a rerun skips frames already in the journal
+            with journal_lock:
+                for name in names:
+                    append_entry(os.path.join(mission_dir, JOURNAL_NAME), {
+                        "type": "caption", "image": name, "model": model,
+                        "caption": result["response"].strip(), "time": time.time()})
+                    done[0] += 1
+                    if done[0] % PROGRESS_EVERY == 0:
+                        rate = done[0] / (time.time() - started) * 60
+                        print(f"{done[0]}/{total} frames, {rate:.1f} frames/min")
+        except Exception as e:
+            print(f"ERROR on {mission_dir}/{names[0]}:", e)
+        finally:
+            in_flight.release()
+
+    with ThreadPoolExecutor(workers) as decode_pool, ThreadPoolExecutor(requests) as infer_pool:
+        for job in jobs:
+            in_flight.acquire()
+            image_future = decode_pool.submit(load, job[1])
+            infer_pool.submit(caption, job, image_future)
 
-        # 5️⃣ Send frame bytes to LLaVA with system prompt
-        full_prompt = SYSTEM_PROMPT + "\n\nDescribe what you see in front of the robot."
-        result = ollama.generate(
-            model="llava:13b",
-            prompt=full_prompt,
-            images=[jpg.tobytes()]
-        )
+    elapsed = time.time() - started
+    print(f"Done: {done[0]} frames in {elapsed:.1f}s ({done[0] / elapsed * 60:.1f} frames/min)")
 
-        ai_text = result["response"]
 
-        # 6️⃣ Send AI response back to Raspberry Pi
-        sock.sendall(("AI:" + ai_text).encode())
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Caption robot camera frames with LLaVA")
+    parser.add_argument("--offline", nargs="?", const=EXPLORATIONS_DIR, metavar="DIR",
+                        help="caption recorded missions instead of the live camera")
+    parser.add_argument("--workers", type=int, default=DECODE_WORKERS)
+    parser.add_argument("--requests", type=int, default=INFERENCE_REQUESTS)
+    parser.add_argument("--model", default=MODEL)
+    args = parser.parse_args()
 
-    except Exception as e:
-        print("ERROR:", e)
-        break
+    if args.offline:
+        caption_missions(args.offline, args.workers, args.requests, args.model)
+    else:
+        live_captioning()
@@ -0,0 +1,99 @@
+import socket
+import time
+
+# ================== RECONNECT POLICY ==================
+BACKOFF_START = 0.5       # seconds before the first retry
+BACKOFF_MAX = 10          # cap between retries
+CONNECT_TIMEOUT = 3
+
+
+class LinkDown(Exception):
+    """Raised by Link when its peer went away; call link.reconnect() and retry."""
+
+    def __init__(self, link, reason):
+        super().__init__(f"{link.name} link down: {reason}")
+        self.link = link
+
+
+class Link:
+    """TCP link to the Pi or the ESP32 that can be re-established in place.
+
+    on_connect(sock) runs after every successful (re)connection, e.g. to
+    restart a reader thread on the new socket.
+    """
+
+    def __init__(self, name, host, port, timeout, on_connect=None):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.on_connect = on_connect
+        self.sock = None
+
+        self.down_since = None
+        self.recoveries = []
+
+    def connect(self):
+        delay = BACKOFF_START
+        while True:
+            try:
+                self.sock = socket.create_connection((self.host, self.port), CONNECT_TIMEOUT)
+                self.sock.settimeout(self.timeout)
+                break
+            except OSError:
+                print(f"Retrying {self.name} in {delay:.1f}s...")
+                time.sleep(delay)
+                delay = min(delay * 2, BACKOFF_MAX)
+
+        if self.down_since is not None:
+            self.recoveries.append(time.time() - self.down_since)
+            print(f"Reconnected to {self.name} after {self.recoveries[-1]:.1f}s")
+            self.down_since = None
+        else:
+            print(f"Connected to {self.name}")
+
+        if self.on_connect:
+            self.on_connect(self.sock)
+
+    def close(self, reason):
+        if self.down_since is None:
+            self.down_since = time.time()
+            print(f"Lost {self.name}: {reason}")
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def reconnect(self):
+        self.close("reconnect requested")
+        self.connect()
+
+    def fail(self, reason):
+        self.close(reason)
+        raise LinkDown(self, reason)
+
+    def sendall(self, data):
+        try:
+            self.sock.sendall(data)
+        except OSError as e:
+            self.fail(e)
+
+    def recv_exact(self, size):
+        """Read exactly size bytes, a short read or timeout means a dead peer."""
+        data = bytearray()
+        while len(data) < size:
+            try:
+                chunk = self.sock.recv(min(size - len(data), 65536))
+            except OSError as e:
+                self.fail(e)
+            if not chunk:
+                self.fail("peer closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def mean_time_to_recover(self):
+        if not self.recoveries:
+            return 0.0
+        return sum(self.recoveries) / len(self.recoveries)
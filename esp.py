@@ -1,6 +1,8 @@
 import network
 import socket
+import struct
 import time
+import errno
 from machine import Pin, PWM, time_pulse_us, I2C
 import _thread
 
@@ -76,6 +78,12 @@ def get_distance_cm():
 emergency = False
 last_escape_time = 0
 
+# ================= TELEMETRY STATE =================
+# Motion codes match MOTION_STATES in telemetry.py on the PC
+IDLE, FORWARD, BACKWARD, LEFT, RIGHT, ESCAPE = range(6)
+motion_state = IDLE
+last_distance = None
+
 # ================= MOTOR =================
 def stop_motors():
     m1a.value(0)
@@ -84,28 +92,40 @@ def stop_motors():
     m2b.value(0)
 
 def forward():
+    global motion_state
+    motion_state = FORWARD
     m1a.value(1); m1b.value(0)
     m2a.value(1); m2b.value(0)
     time.sleep(MOVE_TIME)
     stop_motors()
+    motion_state = IDLE
 
 def backward():
+    global motion_state
+    motion_state = BACKWARD
     m1a.value(0); m1b.value(1)
     m2a.value(0); m2b.value(1)
     time.sleep(MOVE_TIME)
     stop_motors()
+    motion_state = IDLE
 
 def left():
+    global motion_state
+    motion_state = LEFT
     m1a.value(0); m1b.value(1)
     m2a.value(1); m2b.value(0)
     time.sleep(TURN_TIME)
     stop_motors()
+    motion_state = IDLE
 
 def right():
+    global motion_state
+    motion_state = RIGHT
     m1a.value(1); m1b.value(0)
     m2a.value(0); m2b.value(1)
     time.sleep(TURN_TIME)
     stop_motors()
+    motion_state = IDLE
 
 # ================= HEARTBEAT =================
 def heartbeat():
@@ -119,10 +139,11 @@ _thread.start_new_thread(heartbeat, ())
 
 # ================= ESCAPE ROUTINE =================
 def escape_routine():
-    global emergency
+    global emergency, motion_state
 
     print("!!! OBSTACLE ESCAPE !!!")
     stop_motors()
+    motion_state = ESCAPE
     lcd_show("ESCAPE")
 
     m1a.value(0); m1b.value(1)
@@ -135,15 +156,17 @@ def escape_routine():
     time.sleep(2)
     stop_motors()
 
+    motion_state = IDLE
     emergency = False
     lcd_show("IDLE")
 
 # ================= ULTRASONIC LOOP =================
 def ultrasonic_loop():
-    global emergency, last_escape_time
+    global emergency, last_escape_time, last_distance
 
     while True:
         dist = get_distance_cm()
+        last_distance = dist
 
         if dist is not None and dist < 15:
             buzzer.duty_u16(30000)
@@ -164,26 +187,78 @@ _thread.start_new_thread(ultrasonic_loop, ())
 server = socket.socket()
 server.bind(("", 9000))
 server.listen(1)
-server.settimeout(1)
-print("Waiting for PC...")
+server.settimeout(0)      # accept() only polls, a new PC can be noticed mid-session
+
+def accept_pc():
+    print("Waiting for PC...")
+    new_conn = None
+    addr = None
+    while new_conn is None:
+        try:
+            new_conn, addr = server.accept()
+        except:
+            time.sleep(0.1)
+
+    print("PC connected:", addr)
+    new_conn.settimeout(0.1)
+    return new_conn
+
+def waiting_pc():
+    """A PC connecting again means the old link died without a FIN: take the new one."""
+    try:
+        new_conn, addr = server.accept()
+    except OSError:
+        return None
+    print("PC reconnected:", addr)
+    new_conn.settimeout(0.1)
+    return new_conn
 
-conn = None
-addr = None
+def replace_pc(reason):
+    global conn
+    print(reason)
+    stop_motors()
+    lcd_show("WAITING PC")
+    conn.close()
+    conn = accept_pc()
+    lcd_show("CONNECTED")
 
-while conn is None:
-    try:
-        conn, addr = server.accept()
-    except:
-        time.sleep(0.1)
+conn = accept_pc()
+
+# ================= TELEMETRY STREAM =================
+# Fixed-size packet, layout must match TELEMETRY_FMT in telemetry.py:
+# magic, seq, distance (mm, 0xFFFF = no echo), motion state, emergency, ticks (ms)
+TELEMETRY_FMT = "<2sHHBBI"
+TELEMETRY_PERIOD = 0.1
 
-print("PC connected:", addr)
-conn.settimeout(0.1)
+def telemetry_loop():
+    seq = 0
+    while True:
+        dist = last_distance
+        dist_mm = 0xFFFF if dist is None else min(int(dist * 10), 0xFFFE)
+        packet = struct.pack(TELEMETRY_FMT, b"TM", seq & 0xFFFF, dist_mm,
+                             motion_state, 1 if emergency else 0,
+                             time.ticks_ms() & 0xFFFFFFFF)
+        try:
+            conn.send(packet)
+        except OSError:
+            pass
+        seq += 1
+        time.sleep(TELEMETRY_PERIOD)
+
+_thread.start_new_thread(telemetry_loop, ())
 
 lcd_show("CONNECTED")
 
 # ================= MAIN LOOP =================
 while True:
     try:
+        new_conn = waiting_pc()
+        if new_conn:
+            stop_motors()
+            conn.close()
+            conn = new_conn
+            lcd_show("CONNECTED")
+
         if conn:
             try:
                 data = conn.recv(64)
@@ -204,8 +279,13 @@ while True:
                         elif cmd == "STOP":
                             stop_motors()
                             lcd_show("IDLE")
-            except OSError:
-                pass
+                else:
+                    # PC closed the link: stay put until it reconnects
+                    replace_pc("PC disconnected.")
+            except OSError as e:
+                # only the 0.1 s recv timeout is normal, anything else is a dead link
+                if e.args[0] not in (errno.ETIMEDOUT, errno.EAGAIN):
+                    replace_pc("PC link error: " + str(e))
     except Exception as e:
         print("Error:", e)
     time.sleep(0.05)
@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import ollama
+
+from brain import SYSTEM_PROMPT, DECISION_DEADLINE, parse_strict
+from framestore import mission_frames
+from journal import JOURNAL_NAME, decisions
+from preprocess import Preprocessor, input_size
+from stats import percentile
+
+# ================== EVALUATION SETUP ==================
+# evaluate.json lists the configurations to compare; each has a name, a
+# model and optionally a prompt (SYSTEM_PROMPT when missing). "reference" is
+# the config the others are compared with, or "journal" for the decisions
+# recorded during the mission.
+CONFIG_PATH = "evaluate.json"
+EXPLORATIONS_DIR = "explorations"
+FRAME_LIMIT = 60          # frames sampled across the missions
+CONCURRENT_REQUESTS = 4   # requests in flight to ollama, all configs together
+
+
+def sample_frames(missions, limit):
+    """(mission, name, path) for up to limit distinct pictures, spread over the missions."""
+    frames = []
+    seen = set()
+    for mission in missions:
+        for name, path in mission_frames(mission):
+            if path not in seen:
+                seen.add(path)
+                frames.append((mission, name, path))
+    if limit and len(frames) > limit:
+        step = len(frames) / limit
+        frames = [frames[int(i * step)] for i in range(limit)]
+    return frames
+
+
+def recorded_actions(missions):
+    """(mission, frame name) -> action the model chose during the mission."""
+    actions = {}
+    for mission in missions:
+        for e in decisions(os.path.join(mission, JOURNAL_NAME)):
+            if e.get("source") == "model":
+                actions[(mission, e["image"])] = e["action"]
+    return actions
+
+
+def prepare_images(frames, configs):
+    """Encode every frame once per model input size."""
+    images = {}
+    for config in configs:
+        size = input_size(config["model"])
+        if size not in images:
+            prepare = Preprocessor(config["model"])
+            images[size] = [prepare(cv2.imread(path, cv2.IMREAD_COLOR)) for _, _, path in frames]
+    return images
+
+
+def run(configs, frames, requests, timeout):
+    client = ollama.Client(timeout=timeout)
+    images = prepare_images(frames, configs)
+    results = {c["name"]: {"latency": [], "prompt_tokens": [], "output_tokens": [],
+                           "failures": 0, "errors": 0, "actions": {}} for c in configs}
+    lock = threading.Lock()
+
+    def ask(config, i):
+        mission, name, _ = frames[i]
+        image = images[input_size(config["model"])][i]
+        start = time.perf_counter()
+        try:
+            reply = client.generate(model=config["model"], prompt=config.get("prompt", SYSTEM_PROMPT),
+                                    images=[image])
+        except Exception as e:
+            with lock:
+                results[config["name"]]["errors"] += 1
+            print(f"ERROR {config['name']} {name}:", e)
+            return
+        latency = time.perf_counter() - start
+        _, action = parse_strict(reply["response"])
+
+        with lock:
+            r = results[config["name"]]
+            r["latency"].append(latency)
+            r["prompt_tokens"].append(reply.get("prompt_eval_count") or 0)
+            r["output_tokens"].append(reply.get("eval_count") or 0)
+            if action is None:
+                r["failures"] += 1
+            r["actions"][(mission, name)] = action or "STOP"
+
+    started = time.time()
+    with ThreadPoolExecutor(requests) as pool:
+        # frame-major order: every config sees the same load on the server
+        for i in range(len(frames)):
+            for config in configs:
+                pool.submit(ask, config, i)
+    print(f"{len(frames)} frames x {len(configs)} configs in {time.time() - started:.1f}s\n")
+    return results
+
+
+def agreement(actions, reference):
+    shared = [k for k in actions if k in reference]
+    if not shared:
+        return None
+    return sum(actions[k] == reference[k] for k in shared) / len(shared)
+
+
+def print_table(configs, results, reference, reference_name):
+    header = (f"{'config':<18} {'model':<12} {'n':>4} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} "
+              f"{'in tok':>7} {'out tok':>7} {'parse fail':>10} {'late':>6} {'agree':>6}")
+    print(header)
+    print("-" * len(header))
+    for config in configs:
+        r = results[config["name"]]
+        n = len(r["latency"])
+        late = sum(t > DECISION_DEADLINE for t in r["latency"])
+        agree = agreement(r["actions"], reference)
+        print(f"{config['name']:<18} {config['model']:<12} {n:>4} "
+              f"{percentile(r['latency'], 0.5):>7.2f} {percentile(r['latency'], 0.95):>7.2f} "
+              f"{percentile(r['latency'], 0.99):>7.2f} "
+              f"{sum(r['prompt_tokens']) / max(n, 1):>7.0f} {sum(r['output_tokens']) / max(n, 1):>7.0f} "
+              f"{r['failures'] / max(n, 1):>10.0%} {late / max(n, 1):>6.0%} "
+              f"{'-' if agree is None else f'{agree:.0%}':>6}"
+              + (f"  errors: {r['errors']}" if r["errors"] else ""))
+    print(f"\nagreement is with {reference_name}; parse failures and late answers "
+          f"(> {DECISION_DEADLINE:.0f}s) are what main.py turns into STOP")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare models and prompts on recorded missions")
+    parser.add_argument("missions", nargs="*", help=f"mission folders (default: all in {EXPLORATIONS_DIR})")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--limit", type=int, default=FRAME_LIMIT, help="frames to replay, 0 for all")
+    parser.add_argument("--requests", type=int, default=CONCURRENT_REQUESTS)
+    parser.add_argument("--timeout", type=float, default=60, help="seconds before a request is an error")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        setup = json.load(f)
+    configs = setup["configs"]
+
+    missions = args.missions or sorted(
+        os.path.join(EXPLORATIONS_DIR, d) for d in os.listdir(EXPLORATIONS_DIR)
+        if d.startswith("mission_") and os.path.isdir(os.path.join(EXPLORATIONS_DIR, d)))
+    missions = [m.rstrip("/") for m in missions]
+    frames = sample_frames(missions, args.limit)
+    if not frames:
+        raise SystemExit("No recorded frames found.")
+
+    results = run(configs, frames, args.requests, args.timeout)
+
+    reference_name = setup.get("reference", configs[0]["name"])
+    if reference_name == "journal":
+        reference = recorded_actions(missions)
+        reference_name = "the decisions recorded in the journal"
+    else:
+        reference = results[reference_name]["actions"]
+    print_table(configs, results, reference, reference_name)
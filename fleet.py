@@ -0,0 +1,291 @@
+import asyncio
+import argparse
+import json
+import os
+import pickle
+import signal
+import struct
+import time
+from collections import deque
+from datetime import datetime
+
+import cv2
+import ollama
+
+from brain import MODEL, SYSTEM_PROMPT, parse_response, sensor_decision, summary_prompt
+from brain import DECISION_DEADLINE, MAX_FRAME_AGE, FALLBACK_ACTION, FALLBACK_THOUGHT
+from report import append_report, write_report
+from telemetry import TelemetryStore, parse_stream
+from journal import JOURNAL_NAME, append_entry, decisions
+from preprocess import Preprocessor
+from stats import Latencies
+
+# ================== CONFIG ==================
+CONFIG_PATH = "fleet.json"
+STATS_EVERY = 30          # seconds between fleet stat lines
+ESP_RETRY = 2             # seconds between ESP connection attempts
+PI_RETRY = 2              # seconds between Raspberry Pi connection attempts
+FRAME_HEADER = struct.calcsize("L")
+
+
+def split_address(address):
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+# ================== FAIR-SHARE INFERENCE QUEUE ==================
+class FairQueue:
+    """One FIFO per robot, served round-robin so no robot can starve the others."""
+
+    def __init__(self):
+        self.queues = {}
+        self.order = deque()
+        self.pending = asyncio.Semaphore(0)
+
+    def put(self, robot, job):
+        queue = self.queues.setdefault(robot, deque())
+        if not queue:
+            self.order.append(robot)
+        queue.append(job)
+        self.pending.release()
+
+    async def get(self):
+        await self.pending.acquire()
+        robot = self.order.popleft()
+        queue = self.queues[robot]
+        job = queue.popleft()
+        if queue:
+            self.order.append(robot)
+        return job
+
+    def depth(self):
+        return sum(len(q) for q in self.queues.values())
+
+
+async def inference_worker(queue, client, model, busy):
+    while True:
+        job = await queue.get()
+        if job["future"].done():
+            # the robot stopped waiting (deadline), don't spend the model on it
+            continue
+        job["started_at"] = time.perf_counter()
+        try:
+            result = await client.generate(model=model, prompt=job["prompt"],
+                                           images=job["images"])
+            if not job["future"].done():
+                job["future"].set_result(result["response"])
+        except Exception as e:
+            if not job["future"].done():
+                job["future"].set_exception(e)
+        busy[0] += time.perf_counter() - job["started_at"]
+
+
+# ================== ONE ROBOT ==================
+class Robot:
+
+    def __init__(self, name, pi, esp, mission_id, model):
+        self.name = name
+        self.pi = split_address(pi)
+        self.esp = split_address(esp)
+        self.mission_id = f"{mission_id}_{name}"
+        self.base_dir = f"explorations/{self.mission_id}"
+        self.frames_dir = f"{self.base_dir}/frames"
+        self.report_path = f"{self.base_dir}/report.html"
+        self.journal_path = f"{self.base_dir}/{JOURNAL_NAME}"
+        os.makedirs(self.frames_dir, exist_ok=True)
+
+        self.telemetry = TelemetryStore()
+        self.prepare = Preprocessor(model)
+        self.frame_count = 0
+        self.skipped = 0
+        self.deadline_misses = 0
+        self.errors = 0
+        self.stale = 0
+        self.latencies = Latencies()
+        self.waits = Latencies()
+
+    async def connect(self):
+        while True:
+            try:
+                self.pi_reader, self.pi_writer = await asyncio.open_connection(*self.pi)
+                print(f"[{self.name}] Connected to Raspberry Pi")
+                break
+            except OSError:
+                print(f"[{self.name}] Retrying Raspberry Pi...")
+                await asyncio.sleep(PI_RETRY)
+        while True:
+            try:
+                self.esp_reader, self.esp_writer = await asyncio.open_connection(*self.esp)
+                print(f"[{self.name}] Connected to ESP32")
+                break
+            except OSError:
+                print(f"[{self.name}] Retrying ESP...")
+                await asyncio.sleep(ESP_RETRY)
+        self.telemetry_task = asyncio.create_task(self.read_telemetry())
+
+    async def read_telemetry(self):
+        buffer = b""
+        while True:
+            chunk = await self.esp_reader.read(256)
+            if not chunk:
+                break
+            buffer = parse_stream(buffer + chunk, self.telemetry)
+
+    async def get_frame(self):
+        self.pi_writer.write(b"GET_FRAME")
+        await self.pi_writer.drain()
+        size = struct.unpack("L", await self.pi_reader.readexactly(FRAME_HEADER))[0]
+        return pickle.loads(await self.pi_reader.readexactly(size))
+
+    def prepare_image(self, jpg):
+        return self.prepare(cv2.imdecode(jpg, cv2.IMREAD_COLOR))
+
+    async def infer(self, queue, prompt, images):
+        """Queue a request and wait for it, returning (response, queue wait)."""
+        job = {
+            "prompt": prompt,
+            "images": images,
+            "future": asyncio.get_running_loop().create_future(),
+            "queued_at": time.perf_counter(),
+        }
+        queue.put(self.name, job)
+        response = await job["future"]
+        return response, job["started_at"] - job["queued_at"]
+
+    async def run(self, queue, stop):
+        while not stop.is_set():
+            jpg = await self.get_frame()
+            received = time.perf_counter()
+
+            shortcut = sensor_decision(self.telemetry)
+            if shortcut:
+                thought, action = shortcut
+                self.skipped += 1
+            else:
+                image = await asyncio.to_thread(self.prepare_image, jpg)
+                try:
+                    response, wait = await asyncio.wait_for(
+                        self.infer(queue, SYSTEM_PROMPT, [image]), DECISION_DEADLINE)
+                    self.waits.add(wait)
+                except asyncio.TimeoutError:
+                    self.deadline_misses += 1
+                    response = None
+                except Exception as e:
+                    # model host restarting, ResponseError, ...: this frame gets the fallback
+                    print(f"[{self.name}] INFERENCE ERROR:", e)
+                    self.errors += 1
+                    response = None
+                if response is not None and time.perf_counter() - received > MAX_FRAME_AGE:
+                    self.stale += 1
+                    response = None
+
+                if response is None:
+                    thought, action = FALLBACK_THOUGHT, FALLBACK_ACTION
+                else:
+                    thought, action = parse_response(response)
+                self.latencies.add(time.perf_counter() - received)
+
+            self.esp_writer.write(action.encode())
+            self.pi_writer.write(("AI:" + thought).encode())
+            await self.esp_writer.drain()
+            await self.pi_writer.drain()
+
+            # the Pi already sends JPEG, store it as is
+            self.frame_count += 1
+            fname = f"frame_{self.frame_count:03}.jpg"
+            await asyncio.to_thread(jpg.tofile, f"{self.frames_dir}/{fname}")
+            entry = {"frame": self.frame_count, "image": fname, "thought": thought,
+                     "action": action, "time": time.time()}
+            await asyncio.to_thread(append_entry, self.journal_path, entry)
+            await asyncio.to_thread(self.update_report, entry)
+
+    def update_report(self, entry):
+        # the journal is the mission's memory, the report only gets the new card
+        if not append_report(self.report_path, entry):
+            write_report(self.report_path, self.mission_id, decisions(self.journal_path))
+
+    async def finish(self, queue):
+        if self.frame_count:
+            prompt = summary_prompt(decisions(self.journal_path), total=self.frame_count)
+            final_reflection, _ = await self.infer(queue, prompt, [])
+        else:
+            final_reflection = "No observations were collected."
+        append_entry(self.journal_path, {"type": "reflection", "text": final_reflection,
+                                         "time": time.time()})
+        write_report(self.report_path, self.mission_id, decisions(self.journal_path), final_reflection)
+        for writer in (self.pi_writer, self.esp_writer):
+            writer.close()
+        print(f"[{self.name}] Final report saved to:", self.report_path)
+
+    def stats_line(self):
+        return (f"{self.name:<10} {self.frame_count:>6} decisions  {self.skipped:>4} skipped  "
+                f"{self.deadline_misses:>4} missed  {self.errors:>4} errors  {self.stale:>4} stale  "
+                f"latency mean {self.latencies.mean():6.2f}s "
+                f"p95 {self.latencies.percentile(0.95):6.2f}s  "
+                f"queue wait mean {self.waits.mean():6.2f}s "
+                f"p95 {self.waits.percentile(0.95):6.2f}s")
+
+
+# ================== FLEET ==================
+async def report_stats(robots, queue, busy, workers, started):
+    while True:
+        await asyncio.sleep(STATS_EVERY)
+        print_stats(robots, queue, busy, workers, started)
+
+
+def print_stats(robots, queue, busy, workers, started):
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(f"\n[FLEET] queue depth {queue.depth()}, "
+          f"worker utilization {busy[0] / (elapsed * workers):.0%}")
+    for robot in robots:
+        print("  " + robot.stats_line())
+
+
+async def run_fleet(config, duration=None):
+    model = config.get("model", MODEL)
+    workers = config.get("workers", 1)
+    client = ollama.AsyncClient(host=config.get("ollama_host"))
+    mission_id = datetime.now().strftime("mission_%Y-%m-%d_%H-%M")
+    robots = [Robot(r["name"], r["pi"], r["esp"], mission_id, model) for r in config["robots"]]
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGINT, stop.set)
+    if duration:
+        loop.call_later(duration, stop.set)
+
+    queue = FairQueue()
+    busy = [0.0]
+    started = time.perf_counter()
+    pool = [asyncio.create_task(inference_worker(queue, client, model, busy))
+            for _ in range(workers)]
+    stats = asyncio.create_task(report_stats(robots, queue, busy, workers, started))
+
+    await asyncio.gather(*(robot.connect() for robot in robots))
+    print(f"Fleet running: {len(robots)} robots, {workers} inference workers")
+
+    results = await asyncio.gather(*(robot.run(queue, stop) for robot in robots),
+                                   return_exceptions=True)
+    for robot, result in zip(robots, results):
+        if isinstance(result, Exception):
+            print(f"[{robot.name}] ERROR:", result)
+
+    print("\nStopping fleet... Generating final reflections...\n")
+    await asyncio.gather(*(robot.finish(queue) for robot in robots))
+    print_stats(robots, queue, busy, workers, started)
+
+    stats.cancel()
+    for task in pool:
+        task.cancel()
+
+
+# ================== RUN ==================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive several robots from one brain")
+    parser.add_argument("config", nargs="?", default=CONFIG_PATH)
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+    asyncio.run(run_fleet(config, args.duration))
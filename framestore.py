@@ -0,0 +1,208 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# ================== CONTENT-ADDRESSED FRAMES ==================
+# A robot standing still sends the same picture over and over. Each distinct
+# JPEG is written once under blobs/<sha1>.jpg and index.jsonl maps the frame
+# names used everywhere else (frame_001.jpg, ...) to the blob holding them.
+BLOBS_DIR = "blobs"
+INDEX_NAME = "index.jsonl"
+JPEG_QUALITY = 95         # cv2.imwrite's default, what frames/ used to hold
+HASH_SIZE = 8             # dHash of an 9x8 thumbnail -> 64 bits
+NEAR_BITS = 3             # differing dHash bits still counted as the same view
+RECENT_FRAMES = 256       # frame names resolved from memory, older ones from index.jsonl
+
+
+def dhash(frame):
+    """64-bit difference hash: is each pixel brighter than its right neighbour."""
+    grey = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(grey, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def frame_number(name):
+    match = re.search(r"(\d+)", name)
+    return int(match.group(1)) if match else 0
+
+
+class FrameStore:
+    """Writes mission frames once per distinct content.
+
+    near_bits=None only merges byte-identical frames, a number also merges a
+    frame into the previous one when their dHashes differ by at most that
+    many bits.
+    """
+
+    def __init__(self, mission_dir, near_bits=None):
+        self.mission_dir = mission_dir
+        self.index_path = os.path.join(mission_dir, INDEX_NAME)
+        self.near_bits = near_bits
+        self.recent = OrderedDict()   # frame name -> blob path, the last RECENT_FRAMES only
+        self.frames = 0
+        self.blobs = 0
+        self.stored = 0
+        self.last_blob = None
+        self.last_hash = None
+        self.exact = 0
+        self.near = 0
+        self.saved = 0
+        os.makedirs(os.path.join(mission_dir, BLOBS_DIR), exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._remember(entry)
+
+    def _remember(self, entry):
+        blob = entry["blob"]
+        self.recent[entry["image"]] = blob
+        if len(self.recent) > RECENT_FRAMES:
+            self.recent.popitem(last=False)
+        self.frames += 1
+        if entry.get("dup") is None:
+            self.blobs += 1
+            self.stored += entry["bytes"]
+        elif entry["dup"] == "exact":
+            self.exact += 1
+            self.saved += entry["bytes"]
+        else:
+            self.near += 1
+            self.saved += entry["bytes"]
+        self.last_blob = blob
+        self.last_hash = entry.get("dhash")
+
+    def add(self, name, frame=None, data=None):
+        """Store a decoded frame (or already encoded JPEG bytes) under a frame name."""
+        if data is None:
+            data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])[1].tobytes()
+        digest = hashlib.sha1(data).hexdigest()
+        blob = f"{BLOBS_DIR}/{digest[:2]}/{digest}.jpg"
+        path = os.path.join(self.mission_dir, blob)
+
+        if frame is None and self.near_bits is not None:
+            frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+        visual = dhash(frame) if frame is not None else None
+
+        if os.path.exists(path):
+            dup = "exact"
+        elif (self.near_bits is not None and self.last_hash is not None
+              and bin(visual ^ self.last_hash).count("1") <= self.near_bits):
+            dup = "near"
+            blob = self.last_blob
+            visual = self.last_hash      # compare against the kept picture, not drift
+        else:
+            dup = None
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+
+        entry = {"frame": frame_number(name), "image": name, "blob": blob,
+                 "dup": dup, "bytes": len(data), "dhash": visual}
+        with open(self.index_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        self._remember(entry)
+        return blob
+
+    def index(self):
+        """Frame name -> blob for the whole mission, read from index.jsonl."""
+        blobs = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    blobs[entry["image"]] = entry["blob"]
+        return blobs
+
+    def resolve(self, name):
+        """Path of a frame relative to the mission folder."""
+        blob = self.recent.get(name)
+        if blob is None:
+            blob = self.index().get(name)
+        return blob or f"frames/{name}"
+
+    def resolver(self):
+        """resolve() for a pass over the whole mission: reads the index once, not per frame."""
+        blobs = self.index()
+        return lambda name: blobs.get(name, f"frames/{name}")
+
+    def stats(self):
+        return {"frames": self.frames, "blobs": self.blobs,
+                "exact": self.exact, "near": self.near,
+                "stored": self.stored, "saved": self.saved}
+
+    def print_stats(self, label=None):
+        s = self.stats()
+        total = s["stored"] + s["saved"]
+        share = s["saved"] / total * 100 if total else 0
+        print(f"{label or self.mission_dir}: {s['frames']} frames in {s['blobs']} blobs "
+              f"({s['exact']} identical, {s['near']} near-identical), "
+              f"{s['stored'] / 1e6:.1f} MB stored, {s['saved'] / 1e6:.1f} MB saved ({share:.0f}%)")
+
+
+def mission_frames(mission_dir):
+    """(name, path) for every frame of a mission, in order, store or legacy frames/."""
+    index_path = os.path.join(mission_dir, INDEX_NAME)
+    if os.path.exists(index_path):
+        blobs = FrameStore(mission_dir).index()
+        names = sorted(blobs, key=frame_number)
+        return [(n, os.path.join(mission_dir, blobs[n])) for n in names]
+    frames_dir = os.path.join(mission_dir, "frames")
+    if not os.path.isdir(frames_dir):
+        return []
+    names = sorted((n for n in os.listdir(frames_dir) if n.endswith(".jpg")), key=frame_number)
+    return [(n, os.path.join(frames_dir, n)) for n in names]
+
+
+def convert(mission_dir, near_bits=None):
+    """Move a mission recorded with loose frames/ into the store."""
+    frames_dir = os.path.join(mission_dir, "frames")
+    store = FrameStore(mission_dir, near_bits)
+    stored = store.index()
+    for name in sorted(os.listdir(frames_dir), key=frame_number):
+        if name.endswith(".jpg") and name not in stored:
+            with open(os.path.join(frames_dir, name), "rb") as f:
+                stored[name] = store.add(name, data=f.read())
+    for name in os.listdir(frames_dir):
+        if name in stored:
+            os.remove(os.path.join(frames_dir, name))
+    if not os.listdir(frames_dir):
+        os.rmdir(frames_dir)
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deduplicated frame storage per mission")
+    parser.add_argument("missions", nargs="+")
+    parser.add_argument("--convert", action="store_true", help="move loose frames/ into the store")
+    parser.add_argument("--near", type=int, default=None, metavar="BITS",
+                        help="also merge frames whose dHash differs by at most BITS")
+    args = parser.parse_args()
+
+    for mission in args.missions:
+        mission = mission.rstrip("/")
+        if args.convert and os.path.isdir(os.path.join(mission, "frames")):
+            store = convert(mission, args.near)
+        elif os.path.exists(os.path.join(mission, INDEX_NAME)):
+            store = FrameStore(mission)
+        else:
+            print(f"{mission}: no frame store (use --convert)")
+            continue
+        store.print_stats(os.path.basename(mission))
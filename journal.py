@@ -0,0 +1,53 @@
+import json
+import os
+
+# One JSON line per decision, appended as the mission runs so a crash or a
+# restart never loses more than the frame being processed. Other tools add
+# their own lines tagged with "type" (e.g. offline captions).
+JOURNAL_NAME = "journal.jsonl"
+
+
+def append_entry(path, entry):
+    with open(path, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def read_journal(path):
+    """Yield journal entries in order, skipping a torn last line after a crash."""
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def decisions(path):
+    """Only the robot's per-frame decisions."""
+    return (e for e in read_journal(path) if "type" not in e)
+
+
+def entries_of_type(path, kind):
+    return (e for e in read_journal(path) if e.get("type") == kind)
+
+
+class Decision:
+    """Compact in-memory copy of a decision line, readable like the journal dict."""
+    __slots__ = ("frame", "image", "thought", "action", "source")
+
+    def __init__(self, frame, image, thought, action=None, source=None):
+        self.frame = frame
+        self.image = image
+        self.thought = thought
+        self.action = action
+        self.source = source
+
+    @classmethod
+    def from_entry(cls, entry):
+        return cls(entry["frame"], entry["image"], entry["thought"],
+                   entry.get("action"), entry.get("source"))
+
+    def __getitem__(self, key):
+        return getattr(self, key)
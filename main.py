@@ -1,4 +1,3 @@
-import socket
 import struct
 import pickle
 import cv2
@@ -9,251 +8,303 @@ from datetime import datetime
 import threading
 import signal
 import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as InferenceTimeout
+from telemetry import TelemetryStore, start_reader
+from brain import MODEL, SYSTEM_PROMPT, parse_response, sensor_decision, summary_prompt
+from brain import DECISION_DEADLINE, MAX_FRAME_AGE, FALLBACK_ACTION, FALLBACK_THOUGHT
+from brain import TELEMETRY_MAX_AGE, temporal_prompt
+from report import write_report, append_report
+from connection import Link, LinkDown
+from journal import JOURNAL_NAME, Decision, append_entry, decisions
+from preprocess import Preprocessor, tile_frames
+from mapping import OccupancyMap
+from stuck import StuckDetector
+from framestore import FrameStore, NEAR_BITS
 
 # ================== IP CONFIG ==================
-PI_IP = "192.168.4.4"
+# Override with env vars to point the brain at simulator.py
+PI_IP = os.environ.get("ROBOT_PI_IP", "192.168.4.4")
 PI_PORT = 8000
 
-ESP_IP = "192.168.4.1"
+ESP_IP = os.environ.get("ROBOT_ESP_IP", "192.168.4.1")
 ESP_PORT = 9000
 
-# ================== SYSTEM PROMPT ==================
-SYSTEM_PROMPT = """
-You are an autonomous mobile robot with a camera.
-Your mission is to move forward and explore safely.
-
-You must ALWAYS respond using this exact format:
-
-[THOUGHT]
-Describe what you see using short, clear sentences.
-
-[ACTION]
-Choose exactly ONE:
-FORWARD
-BACKWARD
-LEFT
-RIGHT
-STOP
-
-Behavior rules:
-- Your main goal is to keep moving forward.
-- If the path ahead is clear → choose FORWARD.
-- If an obstacle is in front → choose LEFT or RIGHT to go around it.
-- If there is danger, a cliff, or no safe path → choose BACKWARD or STOP.
-- Only choose STOP if no safe movement is possible.
-- Never explain your decision.
-- Never add anything outside this format.
-- Stay focused. Stay active. Keep moving.
-"""
+# ================== LINK HEALTH ==================
+PI_TIMEOUT = 15           # the Pi finishes speaking before it grabs a frame
+ESP_TIMEOUT = 5
+HEARTBEAT_TIMEOUT = 2     # seconds without telemetry before the ESP is declared dead
+
+# ================== VISION INPUT ==================
+PREPROCESS = True         # letterbox to the model's input size before inference
+ROI = None                # e.g. (0.4, 1.0) to only show the floor band ahead
+
+# ================== TEMPORAL CONTEXT ==================
+TEMPORAL_WINDOW = 1       # recent frames per inference call, 1 = current frame only
+TILE_WINDOW = True        # send them as one grid image, one vision-encoder pass
+CONTEXT_ACTIONS = 3       # last actions quoted in the prompt with a window
+
+# ================== FRAME STORAGE ==================
+DEDUP_NEAR = False        # True also merges frames that only differ by sensor noise (lossy)
+
+# ================== MAP ==================
+MAP_SAVE_EVERY = 10       # frames between map.npz / map.png snapshots
+
+# ================== MISSION STATE ==================
+# Only the latest decisions stay in memory, the journal holds the mission and
+# is streamed back for the final report and reflection.
+RECENT_DECISIONS = 50
 
 # ================== EXPLORATION SETUP ==================
-mission_id = datetime.now().strftime("mission_%Y-%m-%d_%H-%M")
+# ROBOT_RESUME=<mission id> continues an existing mission after a restart
+mission_id = os.environ.get("ROBOT_RESUME") or datetime.now().strftime("mission_%Y-%m-%d_%H-%M")
 BASE_DIR = f"explorations/{mission_id}"
-FRAMES_DIR = f"{BASE_DIR}/frames"
-os.makedirs(FRAMES_DIR, exist_ok=True)
-
-log = []
-stop_flag = False
+os.makedirs(BASE_DIR, exist_ok=True)
 
 REPORT_PATH = f"{BASE_DIR}/report.html"
+JOURNAL_PATH = f"{BASE_DIR}/{JOURNAL_NAME}"
 
-# ================== REPORT SYSTEM (UPDATED UI) ==================
-def write_report(final_text=None):
-    html = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-<meta charset="UTF-8">
-<title>AI Exploration Report</title>
-<style>
-* {{
-    box-sizing: border-box;
-    font-family: "Segoe UI", Arial, sans-serif;
-}}
-
-body {{
-    margin: 0;
-    background: #f4f7fb;
-    color: #1a1a1a;
-}}
-
-header {{
-    background: white;
-    border-bottom: 3px solid #1e90ff;
-    display: flex;
-    align-items: center;
-    padding: 15px 30px;
-}}
-
-header img {{
-    height: 50px;
-    margin-right: 15px;
-}}
-
-header h1 {{
-    color: #1e90ff;
-    margin: 0;
-}}
-
-.container {{
-    width: 90%;
-    max-width: 1100px;
-    margin: 30px auto;
-}}
-
-.card {{
-    background: white;
-    border-left: 5px solid #1e90ff;
-    border-radius: 10px;
-    padding: 15px;
-    margin-bottom: 20px;
-    box-shadow: 0 4px 10px rgba(0,0,0,0.08);
-    display: flex;
-    gap: 15px;
-    align-items: center;
-}}
-
-.card img {{
-    width: 220px;
-    border-radius: 8px;
-}}
-
-.final {{
-    background: #1e90ff;
-    color: white;
-    padding: 25px;
-    border-radius: 12px;
-    margin-top: 40px;
-    box-shadow: 0 4px 15px rgba(0,0,0,0.2);
-}}
-</style>
-</head>
-<body>
-
-<header>
-    <img src="../logo.jpg">
-    <h1>AI Exploration Report</h1>
-</header>
-
-<div class="container">
-    <p><b>Mission ID:</b> {mission_id}</p>
-"""
-
-    for item in log:
-        html += f"""
-        <div class="card">
-            <img src="frames/{item['image']}">
-            <p>{item['thought']}</p>
-        </div>
-        """
-
-    if final_text:
-        html += f"""
-        <div class="final">
-            <h2>Final Reflection</h2>
-            <p>{final_text}</p>
-        </div>
-        """
-
-    html += """
-</div>
-</body>
-</html>
-"""
-
-    with open(REPORT_PATH, "w") as f:
-        f.write(html)
+recent = deque((Decision.from_entry(e) for e in decisions(JOURNAL_PATH)), maxlen=RECENT_DECISIONS)
+frame_count = recent[-1].frame if recent else 0
+stop_flag = False
+skipped_inferences = 0
+deadline_misses = 0
+stale_decisions = 0
+timed_decisions = 0
+latency_total = 0.0
+latency_max = 0.0
+model_decisions = 0
+inference_time = 0.0
+
+world_map = OccupancyMap.load(BASE_DIR)
+report_has_map = os.path.exists(f"{BASE_DIR}/map.png")
+frames = FrameStore(BASE_DIR, near_bits=NEAR_BITS if DEDUP_NEAR else None)
+escaping = False
+stuck = StuckDetector()
+
+if recent:
+    print(f"Resuming {mission_id} at frame {frame_count + 1}")
 
 # ================== CTRL+C HANDLER ==================
 def handle_exit(sig, frame):
     print("\nStopping exploration... Generating final reflection...\n")
 
-    if log:
-        summary_prompt = "You explored a place with these observations:\n"
-        for item in log:
-            summary_prompt += f"- {item['thought']}\n"
-        summary_prompt += "\nNow describe what this place is and how you felt during the exploration."
-
+    if frame_count:
         final_reflection = ollama.generate(
-            model="llava:13b",
-            prompt=summary_prompt
+            model=MODEL,
+            prompt=summary_prompt(decisions(JOURNAL_PATH), total=frame_count)
         )["response"]
     else:
         final_reflection = "No observations were collected."
 
-    write_report(final_reflection)
+    append_entry(JOURNAL_PATH, {"type": "reflection", "text": final_reflection, "time": time.time()})
+    world_map.save(BASE_DIR)
+    write_report(REPORT_PATH, mission_id, decisions(JOURNAL_PATH), final_reflection,
+                 resolve=frames.resolver())
     print("Final report saved to:", REPORT_PATH)
+    frames.print_stats("Frame storage")
+    print(f"Distance travelled (dead reckoning): {world_map.distance / 100:.1f} m")
+    print(f"Inferences skipped by sensor fusion: {skipped_inferences}")
+    meters = world_map.distance / 100
+    mode = f"{TEMPORAL_WINDOW}-frame window{' tiled' if TILE_WINDOW else ''}" if TEMPORAL_WINDOW > 1 else "single frame"
+    print(f"Model decisions ({mode}): {model_decisions}, "
+          f"{model_decisions / meters if meters else 0:.2f} per meter, "
+          f"inference time {inference_time:.1f}s")
+    print(f"Deadline misses: {deadline_misses}, stale decisions dropped: {stale_decisions}")
+    print(f"Inference cycles saved by stuck recovery: {stuck.avoided} ({stuck.triggers} maneuvers)")
+    if timed_decisions:
+        print(f"Reaction time: mean {latency_total / timed_decisions:.2f}s, "
+              f"max {latency_max:.2f}s")
+    for link in (pi, esp):
+        if link.recoveries:
+            print(f"{link.name}: {len(link.recoveries)} reconnects, "
+                  f"mean time to recover {link.mean_time_to_recover():.1f}s")
     sys.exit(0)
 
-signal.signal(signal.SIGINT, handle_exit)
+# ================== CONNECTIONS ==================
+telemetry = TelemetryStore()
 
-# ================== CONNECT TO RASPI ==================
-raspi = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-raspi.connect((PI_IP, PI_PORT))
-print("Connected to Raspberry Pi")
+def on_esp_connect(sock):
+    telemetry.reset()
+    start_reader(sock, telemetry)
 
-# ================== CONNECT TO ESP ==================
-esp = socket.socket()
-while True:
+pi = Link("Raspberry Pi", PI_IP, PI_PORT, PI_TIMEOUT)
+esp = Link("ESP32", ESP_IP, ESP_PORT, ESP_TIMEOUT, on_connect=on_esp_connect)
+
+signal.signal(signal.SIGINT, handle_exit)
+
+pi.connect()
+esp.connect()
+
+def check_heartbeat():
+    # Firmware without telemetry never sends anything, only judge links that did
+    age = telemetry.age()
+    if age is not None and age > HEARTBEAT_TIMEOUT:
+        esp.fail(f"no telemetry for {age:.1f}s")
+
+# ================== BOUNDED INFERENCE ==================
+# The HTTP timeout makes ollama drop the request, the executor bounds our wait
+client = ollama.Client(timeout=DECISION_DEADLINE)
+inference_pool = ThreadPoolExecutor(max_workers=1)
+pending = None
+prepare = Preprocessor(MODEL, roi=ROI)
+
+# the grid is cropped frame by frame, so its preprocessor has no ROI
+window = deque(maxlen=TEMPORAL_WINDOW)     # (decoded frame, JPEG from the Pi)
+tile = None
+tile_prepare = Preprocessor(MODEL)
+
+def context_images(frame, jpg):
+    """Images for one inference call: the current frame, or the recent window.
+
+    Without PREPROCESS the Pi's JPEGs go out as received, and a tiled window
+    is only encoded: no ROI, no letterbox.
+    """
+    global tile
+    if TEMPORAL_WINDOW <= 1:
+        return [prepare(frame) if PREPROCESS else jpg.tobytes()]
+    if TILE_WINDOW:
+        tile = tile_frames([f for f, _ in window], TEMPORAL_WINDOW,
+                           roi=ROI if PREPROCESS else None, out=tile)
+        return [tile_prepare(tile) if PREPROCESS else cv2.imencode(".jpg", tile)[1].tobytes()]
+    return [prepare(f) if PREPROCESS else j.tobytes() for f, j in window]
+
+def context_prompt():
+    if TEMPORAL_WINDOW <= 1:
+        return ""
+    actions = [r.action for r in list(recent)[-CONTEXT_ACTIONS:]]
+    return temporal_prompt(len(window), TILE_WINDOW, actions)
+
+def timed_inference(prompt, images, received_at):
+    """Return the model's answer for this frame, or None if it came too late."""
+    global pending, deadline_misses, stale_decisions, inference_time
+
+    if pending is not None and not pending.done():
+        # still busy with a frame we already gave up on
+        deadline_misses += 1
+        return None
+
+    budget = min(DECISION_DEADLINE, MAX_FRAME_AGE - (time.time() - received_at))
+    if budget <= 0:
+        stale_decisions += 1
+        return None
+
+    started = time.time()
+    pending = inference_pool.submit(client.generate, model=MODEL,
+                                    prompt=prompt, images=images)
     try:
-        esp.connect((ESP_IP, ESP_PORT))
-        print("Connected to ESP32")
-        break
-    except:
-        print("Retrying ESP...")
-        time.sleep(2)
+        result = pending.result(timeout=budget)
+    except InferenceTimeout:
+        deadline_misses += 1
+        print(f"\nDEADLINE MISS: no answer after {budget:.1f}s")
+        return None
+    except Exception as e:
+        print("\nINFERENCE ERROR:", e)
+        return None
+    finally:
+        inference_time += time.time() - started
+
+    if time.time() - received_at > MAX_FRAME_AGE:
+        stale_decisions += 1
+        return None
+    return result["response"]
+
+# ================== MAP UPDATES ==================
+def update_map():
+    """Fold the latest distance reading (and any ESP escape) into the map."""
+    global escaping
+    reading = telemetry.get(max_age=TELEMETRY_MAX_AGE)
+    if reading is None:
+        return
+    if reading["emergency"]:
+        if not escaping:
+            world_map.escape()
+        escaping = True
+        return
+    escaping = False
+    world_map.sense(reading["distance"])
 
 # ================== MAIN LOOP ==================
-frame_count = 0
-
 while True:
     try:
-        raspi.sendall(b"GET_FRAME")
-
-        size_data = raspi.recv(8)
-        size = struct.unpack("L", size_data)[0]
+        check_heartbeat()
 
-        data = b""
-        while len(data) < size:
-            data += raspi.recv(4096)
-
-        jpg = pickle.loads(data)
+        pi.sendall(b"GET_FRAME")
+        size = struct.unpack("L", pi.recv_exact(8))[0]
+        jpg = pickle.loads(pi.recv_exact(size))
+        received_at = time.time()
         frame = cv2.imdecode(jpg, cv2.IMREAD_COLOR)
-
-        result = ollama.generate(
-            model="llava:13b",
-            prompt=SYSTEM_PROMPT,
-            images=[jpg.tobytes()]
-        )
-
-        response = result["response"]
-        print("\nAI RESPONSE:\n", response)
-
-        thought = ""
-        action = "STOP"
-
-        if "[THOUGHT]" in response and "[ACTION]" in response:
-            thought = response.split("[THOUGHT]")[1].split("[ACTION]")[0].strip()
-            action = response.split("[ACTION]")[1].strip().upper()
-
-        if action not in ["FORWARD", "BACKWARD", "LEFT", "RIGHT", "STOP"]:
-            action = "STOP"
+        window.append((frame, jpg))
+
+        update_map()
+        stuck.observe(frame)
+        shortcut = sensor_decision(telemetry, avoid=world_map.prefer_turn())
+        recovery = None if shortcut else stuck.next_action()
+
+        if shortcut:
+            thought, action = shortcut
+            skipped_inferences += 1
+            source = "sensor"
+            print("\nSENSOR DECISION:", thought)
+        elif recovery:
+            reason, action = recovery
+            if reason == "recovering":
+                thought = "Turning around to find a new path."
+            else:
+                thought = "I am not making progress. Backing out."
+            source = "recovery"
+            print(f"\nRECOVERY ({reason}):", action)
+        else:
+            response = timed_inference(SYSTEM_PROMPT + world_map.hint() + context_prompt(),
+                                       context_images(frame, jpg), received_at)
+
+            if response is None:
+                thought, action = FALLBACK_THOUGHT, FALLBACK_ACTION
+                source = "fallback"
+            else:
+                print("\nAI RESPONSE:\n", response)
+                thought, action = parse_response(response)
+                source = "model"
+                model_decisions += 1
 
         esp.sendall(action.encode())
+        latency = time.time() - received_at
+        timed_decisions += 1
+        latency_total += latency
+        latency_max = max(latency_max, latency)
+        world_map.move(action)
+        stuck.record(action, source)
         print("Sent to ESP:", action)
 
-        raspi.sendall(("AI:" + thought).encode())
-
         # ========== SAVE FRAME + LOG ==========
         frame_count += 1
         fname = f"frame_{frame_count:03}.jpg"
-        fpath = f"{FRAMES_DIR}/{fname}"
-        cv2.imwrite(fpath, frame)
-
-        log.append({"image": fname, "thought": thought})
-
-        # 🔥 LIVE REPORT UPDATE
-        write_report()
+        frames.add(fname, frame)
+
+        record = Decision(frame_count, fname, thought, action, source)
+        recent.append(record)
+        append_entry(JOURNAL_PATH, {"frame": frame_count, "image": fname,
+                                    "thought": thought, "action": action,
+                                    "source": source, "time": time.time(),
+                                    "latency": round(latency, 3)})
+
+        if frame_count % MAP_SAVE_EVERY == 0:
+            world_map.save(BASE_DIR)
+
+        # 🔥 LIVE REPORT UPDATE: one more card, the whole file only when its layout changes
+        if not report_has_map and os.path.exists(f"{BASE_DIR}/map.png"):
+            report_has_map = True
+            write_report(REPORT_PATH, mission_id, decisions(JOURNAL_PATH), resolve=frames.resolver())
+        elif not append_report(REPORT_PATH, record, resolve=frames.resolve):
+            write_report(REPORT_PATH, mission_id, decisions(JOURNAL_PATH), resolve=frames.resolver())
+
+        # last: the move is already made, a Pi link dropping here must not lose its record
+        pi.sendall(("AI:" + thought).encode())
+
+    except LinkDown as e:
+        # same mission, same frame numbering: just wait for the peer to come back
+        print("ERROR:", e)
+        e.link.reconnect()
 
     except Exception as e:
         print("ERROR:", e)
@@ -0,0 +1,175 @@
+import math
+import os
+
+import cv2
+import numpy as np
+
+import motion
+
+# ================== GRID ==================
+CELL_CM = 5
+CHUNK = 64                # cells added on a side when the robot leaves the grid
+SONAR_TRUST_CM = 200      # free space is only carved this far along a reading
+LOOKAHEAD_CM = 150        # how far to look when comparing directions
+FREE_STEP = 8             # log-odds style updates, clipped to int8
+HIT_STEP = 30
+PATH_POINTS = 2000        # drawn trail; every other point is dropped when it fills up
+MAP_NAME = "map"
+
+
+class OccupancyMap:
+    """Dead-reckoned pose plus an int8 occupancy grid (<0 free, 0 unknown, >0 wall).
+
+    World coordinates are cm with the start at (0, 0) facing +y. The grid
+    grows by whole chunks when the robot gets near an edge.
+    """
+
+    def __init__(self):
+        self.grid = np.zeros((CHUNK, CHUNK), dtype=np.int8)
+        self.visits = np.zeros((CHUNK, CHUNK), dtype=np.uint8)
+        self.origin = np.array([CHUNK // 2, CHUNK // 2])    # cell (row, col) of (0, 0)
+        self.x = 0.0
+        self.y = 0.0
+        self.heading = 90.0
+        self.distance = 0.0
+        self.path = [(0.0, 0.0)]
+        self._visit(0.0, 0.0)
+
+    # ---------- grid storage ----------
+    def _grow(self, rows, cols):
+        """Make room for the given cell indices, padding whole chunks."""
+        h, w = self.grid.shape
+        top = max(0, -int(rows.min()))
+        bottom = max(0, int(rows.max()) - h + 1)
+        left = max(0, -int(cols.min()))
+        right = max(0, int(cols.max()) - w + 1)
+        if not (top or bottom or left or right):
+            return
+        pad = [(math.ceil(top / CHUNK) * CHUNK, math.ceil(bottom / CHUNK) * CHUNK),
+               (math.ceil(left / CHUNK) * CHUNK, math.ceil(right / CHUNK) * CHUNK)]
+        self.grid = np.pad(self.grid, pad)
+        self.visits = np.pad(self.visits, pad)
+        self.origin += (pad[0][0], pad[1][0])
+
+    def _cells(self, xs, ys, grow=True):
+        rows = self.origin[0] + np.floor(np.asarray(ys) / CELL_CM).astype(int)
+        cols = self.origin[1] + np.floor(np.asarray(xs) / CELL_CM).astype(int)
+        if grow:
+            self._grow(rows, cols)
+            rows = self.origin[0] + np.floor(np.asarray(ys) / CELL_CM).astype(int)
+            cols = self.origin[1] + np.floor(np.asarray(xs) / CELL_CM).astype(int)
+        return rows, cols
+
+    def _ray(self, angle_deg, length):
+        rad = math.radians(angle_deg)
+        t = np.arange(0, length, CELL_CM / 2)
+        return self.x + t * math.cos(rad), self.y + t * math.sin(rad)
+
+    def _visit(self, x, y):
+        rows, cols = self._cells([x], [y])
+        self.visits[rows, cols] = np.minimum(self.visits[rows, cols].astype(int) + 1, 255)
+        self.grid[rows, cols] = -100
+
+    # ---------- updates ----------
+    def move(self, action):
+        """Advance the pose for a command sent to the ESP."""
+        self._drive(*motion.action_delta(action)[:2])
+
+    def escape(self):
+        """The ESP ran its own escape_routine."""
+        self._drive(*motion.escape_delta()[:2])
+
+    def _drive(self, distance, turn):
+        if distance:
+            rad = math.radians(self.heading)
+            steps = max(1, int(abs(distance) // CELL_CM))
+            for _ in range(steps):
+                self.x += distance / steps * math.cos(rad)
+                self.y += distance / steps * math.sin(rad)
+                self._visit(self.x, self.y)
+            self.distance += abs(distance)
+            self.path.append((self.x, self.y))
+            if len(self.path) > PATH_POINTS:
+                # halve the trail's resolution, keeping the start and the current pose
+                self.path = self.path[:-1:2] + [self.path[-1]]
+        self.heading = (self.heading + turn) % 360
+
+    def sense(self, distance_cm):
+        """Carve free space ahead and mark the echo, None means nothing in range."""
+        reach = SONAR_TRUST_CM if distance_cm is None else min(distance_cm, SONAR_TRUST_CM)
+        xs, ys = self._ray(self.heading, reach)
+        rows, cols = self._cells(xs, ys)
+        values = self.grid[rows, cols].astype(np.int16) - FREE_STEP
+        self.grid[rows, cols] = np.clip(values, -100, 100)
+
+        if distance_cm is not None and distance_cm < SONAR_TRUST_CM:
+            rad = math.radians(self.heading)
+            hit_r, hit_c = self._cells([self.x + distance_cm * math.cos(rad)],
+                                       [self.y + distance_cm * math.sin(rad)])
+            value = int(self.grid[hit_r[0], hit_c[0]]) + HIT_STEP
+            self.grid[hit_r, hit_c] = min(value, 100)
+
+    # ---------- decisions ----------
+    def novelty(self, turn):
+        """Unknown cells minus revisits along a ray turned by `turn` degrees."""
+        xs, ys = self._ray(self.heading + turn, LOOKAHEAD_CM)
+        rows, cols = self._cells(xs, ys, grow=False)
+        inside = (rows >= 0) & (rows < self.grid.shape[0]) & (cols >= 0) & (cols < self.grid.shape[1])
+        # cells beyond the grid have never been seen
+        unknown = int((~inside).sum())
+        rows, cols = rows[inside], cols[inside]
+        blocked = np.nonzero(self.grid[rows, cols] > 0)[0]
+        if len(blocked):
+            rows, cols = rows[:blocked[0]], cols[:blocked[0]]
+            unknown = 0
+        unknown += int((self.grid[rows, cols] == 0).sum())
+        return unknown - int(self.visits[rows, cols].sum())
+
+    def prefer_turn(self):
+        """LEFT or RIGHT, whichever side looks less explored."""
+        return "LEFT" if self.novelty(90) >= self.novelty(-90) else "RIGHT"
+
+    def hint(self):
+        scores = {"FORWARD": self.novelty(0), "LEFT": self.novelty(90), "RIGHT": self.novelty(-90)}
+        best = max(scores, key=scores.get)
+        if scores[best] <= 0:
+            return ""
+        return f"\nMap memory: the least explored direction is {best}."
+
+    # ---------- output ----------
+    def render(self, scale=3):
+        img = np.full(self.grid.shape + (3,), 160, dtype=np.uint8)
+        img[self.grid < 0] = (255, 255, 255)
+        img[self.grid > 0] = (40, 40, 40)
+        img[self.visits > 0] = (250, 210, 160)
+
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_NEAREST)
+        rows, cols = self._cells(*zip(*self.path), grow=False)
+        points = np.stack([cols, rows], axis=1) * scale + scale // 2
+        cv2.polylines(img, [points.astype(np.int32)], False, (0, 0, 220), 1)
+        cv2.circle(img, tuple(int(v) for v in points[-1]), 2 * scale, (0, 160, 0), -1)
+        # +y is up in the world, down in images
+        return cv2.flip(img, 0)
+
+    @classmethod
+    def load(cls, base_dir):
+        """Restore a saved map, or start a new one if the mission has none."""
+        m = cls()
+        path = os.path.join(base_dir, MAP_NAME + ".npz")
+        if os.path.exists(path):
+            data = np.load(path)
+            m.grid = data["grid"]
+            m.visits = data["visits"]
+            m.origin = data["origin"]
+            m.x, m.y, m.heading = (float(v) for v in data["pose"])
+            m.path = [tuple(p) for p in data["path"]]
+            m.distance = float(data["distance"]) if "distance" in data else 0.0
+        return m
+
+    def save(self, base_dir):
+        np.savez_compressed(os.path.join(base_dir, MAP_NAME + ".npz"),
+                            grid=self.grid, visits=self.visits, origin=self.origin,
+                            pose=np.array([self.x, self.y, self.heading]),
+                            path=np.array(self.path), distance=self.distance,
+                            cell_cm=CELL_CM)
+        cv2.imwrite(os.path.join(base_dir, MAP_NAME + ".png"), self.render())
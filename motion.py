@@ -0,0 +1,49 @@
+import math
+
+# ================== ESP32 TIMINGS ==================
+# Copied from esp.py, keep in sync when the firmware changes
+MOVE_TIME = 3
+TURN_TIME = 1
+ESCAPE_BACK_TIME = 0.5
+ESCAPE_TURN_TIME = 2
+ESCAPE_DISTANCE_CM = 15
+
+# ================== ROBOT KINEMATICS ==================
+# Rough figures measured on the robot with fresh batteries
+FORWARD_SPEED_CM_S = 10.0
+TURN_SPEED_DEG_S = 90.0
+ROBOT_RADIUS_CM = 12.0
+
+ACTIONS = ["FORWARD", "BACKWARD", "LEFT", "RIGHT", "STOP"]
+
+
+def action_delta(action):
+    """Return (distance_cm, turn_deg, duration_s) for one ESP command.
+
+    Heading is counter-clockwise, so LEFT is a positive turn.
+    """
+    if action == "FORWARD":
+        return FORWARD_SPEED_CM_S * MOVE_TIME, 0.0, MOVE_TIME
+    if action == "BACKWARD":
+        return -FORWARD_SPEED_CM_S * MOVE_TIME, 0.0, MOVE_TIME
+    if action == "LEFT":
+        return 0.0, TURN_SPEED_DEG_S * TURN_TIME, TURN_TIME
+    if action == "RIGHT":
+        return 0.0, -TURN_SPEED_DEG_S * TURN_TIME, TURN_TIME
+    return 0.0, 0.0, 0.0
+
+
+def escape_delta():
+    """The esp.py escape_routine: short reverse, then a long right spin."""
+    return (-FORWARD_SPEED_CM_S * ESCAPE_BACK_TIME,
+            -TURN_SPEED_DEG_S * ESCAPE_TURN_TIME,
+            ESCAPE_BACK_TIME + ESCAPE_TURN_TIME)
+
+
+def apply_action(x, y, heading, action):
+    """Dead-reckon the pose (cm, cm, degrees) after an unobstructed command."""
+    distance, turn, _ = action_delta(action)
+    rad = math.radians(heading)
+    return (x + distance * math.cos(rad),
+            y + distance * math.sin(rad),
+            (heading + turn) % 360)
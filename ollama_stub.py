@@ -0,0 +1,101 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timezone
+import hashlib
+import json
+import sys
+import time
+
+# Minimal stand-in for the ollama HTTP API, enough for ollama.generate().
+# Answers are picked from a hash of the images so replays are repeatable.
+PORT = 11434
+LATENCY = 0.05          # seconds per request, raise it to mimic llava on CPU
+IMAGE_COST = 0.5        # extra share of LATENCY for each image after the first
+
+# model -> (latency factor, share of answers that break the format), so
+# evaluate.py has differences to measure; unknown models behave like llava:13b
+MODEL_PROFILES = {
+    "llava:13b": (1.0, 0.0),
+    "llava:7b": (0.6, 0.03),
+    "moondream": (0.25, 0.12),
+}
+
+# no STOP: a robot that stops sees the same frame and would stop forever
+ACTIONS = ["FORWARD", "FORWARD", "FORWARD", "LEFT", "RIGHT", "BACKWARD"]
+THOUGHTS = [
+    "I see a clear floor ahead.",
+    "A wall is in front of me.",
+    "There is a box on the left.",
+    "The room is quiet and empty.",
+]
+
+
+def fake_response(prompt, images, model="llava:13b"):
+    digest = hashlib.sha1(prompt.encode() + "".join(images).encode()).digest()
+    if "[ACTION]" not in prompt:
+        return "This looks like an indoor room. I felt calm while exploring."
+    thought = THOUGHTS[digest[0] % len(THOUGHTS)]
+    if digest[2] / 256 < MODEL_PROFILES.get(model, (1.0, 0.0))[1]:
+        return f"{thought} I think I should go {ACTIONS[digest[1] % len(ACTIONS)].lower()}."
+    # other models agree most of the time, not always
+    if model in MODEL_PROFILES and model != "llava:13b" and digest[3] % 5 == 0:
+        digest = hashlib.sha1(model.encode() + digest).digest()
+    action = ACTIONS[digest[1] % len(ACTIONS)]
+    return f"[THOUGHT]\n{thought}\n\n[ACTION]\n{action}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self.send_json({"models": [{"name": name} for name in MODEL_PROFILES]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        start = time.perf_counter_ns()
+        model = body.get("model", "llava:13b")
+        prompt = body.get("prompt", "")
+        images = body.get("images") or []
+        encoder = 1 + IMAGE_COST * max(0, len(images) - 1)
+        time.sleep(LATENCY * MODEL_PROFILES.get(model, (1.0, 0.0))[0] * encoder)
+        response = fake_response(prompt, images, model)
+
+        self.send_json({
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "response": response,
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": len(prompt.split()) + 576 * len(images),
+            "eval_count": len(response.split()),
+            "total_duration": time.perf_counter_ns() - start,
+        })
+
+    def send_json(self, data):
+        payload = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port=PORT):
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    print(f"ollama stand-in on http://127.0.0.1:{port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        LATENCY = float(sys.argv[1])
+    serve()
@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+import time
+
+# Stand-ins for nmcli, pactl and pacmd so raspi.py can boot on a laptop:
+#   ROBOT_NMCLI="python pi_standins.py nmcli" ROBOT_PACTL="python pi_standins.py pactl" \
+#   ROBOT_PACMD="python pi_standins.py pacmd" python raspi.py
+# ROBOT_STANDIN_DELAY scales how slow the fake network and audio stack are.
+DELAY = float(os.environ.get("ROBOT_STANDIN_DELAY", "1.0"))
+WIFI_STATE = os.path.join(tempfile.gettempdir(), "robot_standin_wifi")
+SSID = "AI_ROBOT"
+
+
+def nmcli(args):
+    if "connect" in args:
+        time.sleep(3 * DELAY)       # association + DHCP
+        open(WIFI_STATE, "w").close()
+        print("Device 'wlan0' successfully activated.")
+        return
+    time.sleep(0.2 * DELAY)
+    print(f"{'yes' if os.path.exists(WIFI_STATE) else 'no'}:{SSID}")
+    print("no:HomeNetwork")
+
+
+def pactl(args):
+    time.sleep(DELAY)
+    print("1\tbluez_sink.00_11_22_33_44_55.a2dp_sink\tmodule-bluez5-device.c\ts16le 2ch 44100Hz\tSUSPENDED")
+
+
+def pacmd(args):
+    time.sleep(0.2 * DELAY)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "reset":
+        if os.path.exists(WIFI_STATE):
+            os.remove(WIFI_STATE)
+    else:
+        {"nmcli": nmcli, "pactl": pactl, "pacmd": pacmd}[sys.argv[1]](sys.argv[2:])
@@ -0,0 +1,182 @@
+import argparse
+import math
+import time
+
+import cv2
+import numpy as np
+
+from brain import MODEL
+
+# ================== MODEL INPUT ==================
+# Native square input of each model's vision encoder, in pixels
+MODEL_INPUT_SIZE = {
+    "llava": 336,
+    "bakllava": 336,
+    "llava-phi3": 336,
+    "llava-llama3": 336,
+    "moondream": 378,
+}
+DEFAULT_INPUT_SIZE = 336
+
+# ================== DEFAULTS ==================
+ROI = None                # (top, bottom) fractions of the frame, (0.4, 1.0) = floor band
+JPEG_QUALITY = 85
+NORMALIZE_EXPOSURE = True
+TARGET_BRIGHTNESS = 0.5   # mean luminance after normalization, 0..1
+MAX_GAMMA = 2.5
+
+
+def input_size(model):
+    return MODEL_INPUT_SIZE.get(model.split(":")[0], DEFAULT_INPUT_SIZE)
+
+
+class Preprocessor:
+    """Crop, letterbox, normalize and encode a BGR frame for the vision model.
+
+    Buffers are allocated once per input shape, so the per-frame cost is a
+    resize, a LUT and a single JPEG encode. Not thread-safe: use one per robot.
+    """
+
+    def __init__(self, model, roi=ROI, quality=JPEG_QUALITY, normalize=NORMALIZE_EXPOSURE):
+        self.size = input_size(model)
+        self.roi = roi
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.normalize = normalize
+
+        self.canvas = np.zeros((self.size, self.size, 3), dtype=np.uint8)
+        self.scaled = None
+        self.offset = (0, 0)
+        self.ramp = np.arange(256, dtype=np.float32) / 255
+        self.curve = np.empty(256, dtype=np.float32)
+        self.lut = np.empty(256, dtype=np.uint8)
+
+    def _layout(self, h, w):
+        scale = self.size / max(h, w)
+        nh, nw = max(1, round(h * scale)), max(1, round(w * scale))
+        if self.scaled is None or self.scaled.shape[:2] != (nh, nw):
+            self.scaled = np.empty((nh, nw, 3), dtype=np.uint8)
+            self.offset = ((self.size - nh) // 2, (self.size - nw) // 2)
+            self.canvas[:] = 0
+        return nw, nh, scale
+
+    def _normalize(self):
+        b, g, r, _ = cv2.mean(self.scaled)
+        mean = (0.114 * b + 0.587 * g + 0.299 * r) / 255
+        if mean <= 0.01 or mean >= 0.99:
+            return
+        gamma = np.clip(np.log(TARGET_BRIGHTNESS) / np.log(mean), 1 / MAX_GAMMA, MAX_GAMMA)
+        np.power(self.ramp, gamma, out=self.curve)
+        np.multiply(self.curve, 255, out=self.curve)
+        np.copyto(self.lut, self.curve, casting="unsafe")
+        cv2.LUT(self.scaled, self.lut, dst=self.scaled)
+
+    def __call__(self, frame):
+        if self.roi:
+            h = frame.shape[0]
+            frame = frame[int(self.roi[0] * h):int(self.roi[1] * h)]
+
+        h, w = frame.shape[:2]
+        nw, nh, scale = self._layout(h, w)
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        cv2.resize(frame, (nw, nh), dst=self.scaled, interpolation=interpolation)
+
+        if self.normalize:
+            self._normalize()
+
+        y, x = self.offset
+        self.canvas[y:y + nh, x:x + nw] = self.scaled
+        _, buffer = cv2.imencode(".jpg", self.canvas, self.params)
+        return buffer.tobytes()
+
+
+# ================== TEMPORAL CONTEXT ==================
+def tile_frames(frames, slots, roi=ROI, out=None):
+    """Grid of frames in time order, left to right then top to bottom.
+
+    The grid always has room for `slots` frames so its shape (and the
+    Preprocessor buffers behind it) stays the same while the window fills;
+    missing older frames stay black. Pass the previous result as `out` to
+    reuse it.
+    """
+    cols = math.ceil(math.sqrt(slots))
+    rows = math.ceil(slots / cols)
+    h, w = frames[-1].shape[:2]
+    if roi:
+        h = int(roi[1] * h) - int(roi[0] * h)
+    shape = (rows * h, cols * w, 3)
+    if out is None or out.shape != shape:
+        out = np.zeros(shape, dtype=np.uint8)
+    elif len(frames) < slots:
+        out[:] = 0
+
+    for i, frame in enumerate(frames, start=slots - len(frames)):
+        if roi:
+            fh = frame.shape[0]
+            frame = frame[int(roi[0] * fh):int(roi[1] * fh)]
+        r, c = divmod(i, cols)
+        cell = out[r * h:(r + 1) * h, c * w:(c + 1) * w]
+        if frame.shape[:2] == (h, w):
+            cell[:] = frame
+        else:
+            cell[:] = cv2.resize(frame, (w, h), interpolation=cv2.INTER_AREA)
+    return out
+
+
+# ================== BENCHMARK ==================
+# python preprocess.py explorations/mission_x --limit 30
+# Sends every recorded frame twice (raw JPEG, preprocessed) and compares the
+# vision encoder time ollama reports and the actions the model chooses.
+def benchmark(mission_dir, model, limit, roi):
+    import ollama
+    from brain import SYSTEM_PROMPT, parse_response
+    from framestore import mission_frames
+
+    paths = [path for _, path in mission_frames(mission_dir)][:limit]
+    if not paths:
+        print("No frames found in", mission_dir)
+        return
+
+    prep = Preprocessor(model, roi=roi)
+    results = {"raw": [], "prep": []}
+    prep_times = []
+
+    for path in paths:
+        with open(path, "rb") as f:
+            raw = f.read()
+        start = time.perf_counter()
+        prepared = prep(cv2.imread(path, cv2.IMREAD_COLOR))
+        prep_times.append(time.perf_counter() - start)
+
+        for name, image in (("raw", raw), ("prep", prepared)):
+            result = ollama.generate(model=model, prompt=SYSTEM_PROMPT, images=[image])
+            response = result["response"]
+            _, action = parse_response(response)
+            results[name].append({
+                "encode": (result.get("prompt_eval_duration") or 0) / 1e9,
+                "total": (result.get("total_duration") or 0) / 1e9,
+                "bytes": len(image),
+                "action": action,
+                "parsed": "[ACTION]" in response,
+            })
+
+    n = len(paths)
+    print(f"\n{n} frames, model {model}, input {prep.size}px, roi {roi}")
+    print(f"preprocessing: {1000 * sum(prep_times) / n:.2f} ms/frame")
+    print(f"{'mode':<6} {'bytes':>8} {'encode s':>9} {'total s':>8} {'parsed':>7}")
+    for name, rows in results.items():
+        print(f"{name:<6} {sum(r['bytes'] for r in rows) / n:>8.0f} "
+              f"{sum(r['encode'] for r in rows) / n:>9.3f} "
+              f"{sum(r['total'] for r in rows) / n:>8.3f} "
+              f"{sum(r['parsed'] for r in rows) / n:>7.0%}")
+    same = sum(a["action"] == b["action"] for a, b in zip(results["raw"], results["prep"]))
+    print(f"same action with and without preprocessing: {same / n:.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark frame preprocessing on a recorded mission")
+    parser.add_argument("mission")
+    parser.add_argument("--model", default=MODEL)
+    parser.add_argument("--limit", type=int, default=30)
+    parser.add_argument("--roi", type=float, nargs=2, metavar=("TOP", "BOTTOM"))
+    args = parser.parse_args()
+    benchmark(args.mission, args.model, args.limit, tuple(args.roi) if args.roi else None)
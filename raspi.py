@@ -8,6 +8,8 @@ import subprocess
 import pygame
 import threading
 import math
+import os
+import select
 
 # ---------------- CONFIG ----------------
 HOST = "0.0.0.0"
@@ -18,13 +20,98 @@ JPEG_QUALITY = 100
 ESP_SSID = "AI_ROBOT"          # ESP32 AP name
 ESP_PASSWORD = "12345678"      # Replace with your ESP password
 
+# System commands, point them at pi_standins.py to time a boot off the robot
+NMCLI = os.environ.get("ROBOT_NMCLI", "nmcli")
+PACTL = os.environ.get("ROBOT_PACTL", "pactl")
+PACMD = os.environ.get("ROBOT_PACMD", "pacmd")
+
+# ---------------- BOOT TIMEOUTS ----------------
+# Seconds each subsystem gets before boot moves on without it (it keeps trying)
+WIFI_TIMEOUT = 60
+BLUETOOTH_TIMEOUT = 5
+TTS_TIMEOUT = 10
+CAMERA_TIMEOUT = 10
+WIFI_RETRY = 1                 # nmcli connect blocks until associated, just re-check
+FRAME_WAIT = 5                 # how long GET_FRAME waits for the camera
+
+# ---------------- PC LINK ----------------
+# A Wi-Fi drop loses the PC's FIN: poll for a newer connection and let TCP
+# keepalive kill a silent one, instead of blocking in recv() forever
+PC_POLL = 1                    # seconds between checks for a reconnecting PC
+KEEPALIVE_IDLE = 5
+KEEPALIVE_INTERVAL = 2
+KEEPALIVE_COUNT = 3
+
+# ---------------- BOOT ORCHESTRATOR ----------------
+class Boot:
+    """Runs subsystems on their own threads and logs a boot timeline."""
+
+    def __init__(self):
+        self.t0 = time.monotonic()
+        self.steps = {}
+
+    def elapsed(self):
+        return time.monotonic() - self.t0
+
+    def mark(self, label):
+        print(f"[boot {self.elapsed():6.2f}s] {label}")
+
+    def start(self, name, fn, timeout, after=()):
+        step = {"start": None, "end": None, "status": "waiting", "timeout": timeout,
+                "done": threading.Event()}
+        self.steps[name] = step
+
+        def run():
+            for dep in after:
+                self.wait(dep)
+            step["deadline"] = time.monotonic() + timeout
+            step["start"] = self.elapsed()
+            try:
+                fn()
+                step["status"] = "ready"
+            except Exception as e:
+                step["status"] = f"failed: {e}"
+            step["end"] = self.elapsed()
+            self.mark(f"{name} {step['status']}")
+            step["done"].set()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def wait(self, name, timeout=None):
+        """True once the step is ready, False if it failed or timed out."""
+        step = self.steps[name]
+        step["done"].wait(timeout)
+        return step["status"] == "ready"
+
+    def failed(self, name):
+        return self.steps[name]["status"].startswith("failed")
+
+    def timeline(self):
+        """Wait for every step up to its own timeout, then print the timeline."""
+        for name, step in self.steps.items():
+            deadline = time.monotonic() + step["timeout"]
+            while step["start"] is None and time.monotonic() < deadline:
+                time.sleep(0.05)
+            if step["start"] is not None:
+                deadline = step["deadline"]
+            if not step["done"].wait(max(0, deadline - time.monotonic())):
+                step["status"] = "timed out (still trying)" if step["start"] is not None else "never started"
+                self.mark(f"{name} {step['status']}")
+
+        print("---------------- BOOT TIMELINE ----------------")
+        for name, step in sorted(self.steps.items(), key=lambda kv: kv[1]["start"] or 0):
+            end = f"{step['end']:6.2f}s" if step["end"] is not None else "   ...  "
+            print(f"{name:<10} {step['start'] or 0:6.2f}s -> {end}  {step['status']}")
+
+boot = Boot()
+
 # ---------------- AUTO CONNECT TO ESP AP ----------------
 def connect_to_esp():
     connected = False
     while not connected:
         try:
             # Check current connection
-            output = subprocess.check_output("nmcli -t -f ACTIVE,SSID dev wifi", shell=True).decode()
+            output = subprocess.check_output(f"{NMCLI} -t -f ACTIVE,SSID dev wifi", shell=True).decode()
             for line in output.splitlines():
                 active, ssid = line.split(":")
                 if active == "yes" and ssid == ESP_SSID:
@@ -34,54 +121,180 @@ def connect_to_esp():
 
             if not connected:
                 print(f"Connecting to {ESP_SSID}...")
-                subprocess.run(f"nmcli dev wifi connect '{ESP_SSID}' password '{ESP_PASSWORD}'", shell=True)
-                time.sleep(5)  # give it some time to connect
+                subprocess.run(f"{NMCLI} dev wifi connect '{ESP_SSID}' password '{ESP_PASSWORD}'", shell=True)
+                time.sleep(WIFI_RETRY)
 
         except Exception as e:
             print("WiFi connection failed:", e)
             time.sleep(3)
 
-connect_to_esp()  # wait for WiFi before starting
-
 # ---------------- BLUETOOTH TTS ----------------
 def get_bluetooth_speaker_sink():
     try:
-        sinks = subprocess.check_output("pactl list short sinks", shell=True).decode()
+        sinks = subprocess.check_output(f"{PACTL} list short sinks", shell=True).decode()
         for line in sinks.splitlines():
             if "bluez_sink" in line:
                 sink_name = line.split()[1]
-                subprocess.run(f"pacmd set-default-sink {sink_name}", shell=True)
+                subprocess.run(f"{PACMD} set-default-sink {sink_name}", shell=True)
                 print(f"TTS routed to Bluetooth speaker: {sink_name}")
                 return sink_name
     except Exception as e:
         print("Bluetooth speaker detection failed:", e)
     return None
 
-get_bluetooth_speaker_sink()
-
 # ---------------- TTS ----------------
-engine = pyttsx3.init()
-engine.setProperty('rate', 145)
-engine.setProperty('volume', 1.0)
+engine = None
 speaking_flag = threading.Event()
 
+def init_tts():
+    global engine
+    tts = pyttsx3.init()
+    tts.setProperty('rate', 145)
+    tts.setProperty('volume', 1.0)
+    engine = tts
+
 def tts_speak(text):
+    if not boot.wait("tts", TTS_TIMEOUT):
+        print("(no voice) " + text)
+        return
     speaking_flag.set()
     engine.say(text)
     engine.runAndWait()
     speaking_flag.clear()
 
 # ---------------- CAMERA ----------------
-cam = cv2.VideoCapture(CAM_INDEX)
-if not cam.isOpened():
-    print(f"No camera found at {CAM_INDEX}")
-    exit()
+# A grabber thread reads the camera continuously and publishes each finished
+# frame; GET_FRAME only copies the newest one and never waits for the camera.
+cam = None
+cam_lock = threading.Lock()     # guards latest_image only, never held during a read
+latest_image = None
+camera_ready = threading.Event()
+
+def open_camera():
+    global cam
+    cam = cv2.VideoCapture(CAM_INDEX)
+    if not cam.isOpened():
+        raise RuntimeError(f"No camera found at {CAM_INDEX}")
+    publish_frame()
+    camera_ready.set()
+    threading.Thread(target=grab_frames, daemon=True).start()
+
+def publish_frame():
+    global latest_image
+    ok, frame = cam.read()
+    if ok:
+        with cam_lock:
+            latest_image = frame
+    return ok
+
+def grab_frames():
+    while True:
+        if not publish_frame():
+            time.sleep(0.01)
+
+def latest_frame():
+    if not camera_ready.wait(FRAME_WAIT):
+        return False, None
+    with cam_lock:
+        frame = latest_image
+    if frame is None:
+        return False, None
+    return True, frame.copy()
+
+# ---------------- SOCKET ----------------
+def start_socket_server():
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((HOST, PORT))
+    server.listen(1)
+    threading.Thread(target=socket_thread, args=(server,), daemon=True).start()
+
+def socket_thread(server):
+    # keep accepting so the PC can reconnect and resume the same mission
+    while True:
+        print("Waiting for PC...")
+        conn, addr = server.accept()
+        print("PC connected:", addr)
+        serve_pc(conn, server)
+        conn.close()
+
+def enable_keepalive(conn):
+    conn.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, KEEPALIVE_IDLE)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, KEEPALIVE_INTERVAL)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, KEEPALIVE_COUNT)
+
+first_frame_sent = threading.Event()
+
+def serve_pc(conn, server):
+    global ui_state
+    conn.settimeout(PC_POLL)
+    enable_keepalive(conn)
+    while True:
+        try:
+            try:
+                data = conn.recv(1024).decode()
+            except socket.timeout:
+                # the PC reconnecting means this link is dead, even without a FIN
+                if select.select([server], [], [], 0)[0]:
+                    print("PC reconnected, dropping the old link.")
+                    break
+                continue
+
+            if not data:
+                print("PC disconnected.")
+                ui_state = "talking"
+                tts_speak("Goodbye everyone, I hope you enjoyed the exploration.")
+                ui_state = "idle"
+                break
+
+            if data.startswith("AI:"):
+                ui_state = "talking"
+                tts_speak(data[3:])
+                ui_state = "idle"
+
+            elif data == "GET_FRAME":
+                while speaking_flag.is_set():
+                    time.sleep(0.05)
+
+                ret, frame = latest_frame()
+                if not ret:
+                    continue
+
+                frame = cv2.resize(frame, (320, 240))
+                _, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+                payload = pickle.dumps(buffer)
+                conn.sendall(struct.pack("L", len(payload)) + payload)
+
+                if not first_frame_sent.is_set():
+                    first_frame_sent.set()
+                    boot.mark("first frame sent to PC")
+
+        except Exception as e:
+            print("ERROR:", e)
+            ui_state = "talking"
+            tts_speak("Goodbye everyone, I hope you enjoyed the exploration.")
+            ui_state = "idle"
+            time.sleep(1)
+            break
+
+# ---------------- START SUBSYSTEMS ----------------
+# The PC only needs the socket and the camera, they come first; the rest
+# starts alongside and the greeting waits for the speaker.
+boot.start("socket", start_socket_server, timeout=1)
+boot.start("camera", open_camera, timeout=CAMERA_TIMEOUT)
+boot.start("wifi", connect_to_esp, timeout=WIFI_TIMEOUT)
+boot.start("bluetooth", get_bluetooth_speaker_sink, timeout=BLUETOOTH_TIMEOUT)
+boot.start("tts", init_tts, timeout=TTS_TIMEOUT)
 
 # ---------------- PYGAME UI ----------------
+# SDL wants the display on the main thread, it initializes while the others boot
 pygame.init()
 screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
 pygame.display.set_caption("Cute AI Robot UI")
 clock = pygame.time.Clock()
+boot.mark("display ready")
 
 ui_state = "booting"
 
@@ -115,7 +328,8 @@ def startup_sequence():
     time.sleep(1.2)
     ui_state = "idle"
 
-threading.Thread(target=startup_sequence, daemon=True).start()
+boot.start("greeting", startup_sequence, timeout=30, after=("bluetooth",))
+threading.Thread(target=boot.timeline, daemon=True).start()
 
 # ---------------- DRAW FACE ----------------
 def draw_robot_face(dt):
@@ -181,54 +395,6 @@ def draw_robot_face(dt):
 
     pygame.display.flip()
 
-# ---------------- SOCKET ----------------
-def socket_thread():
-    global ui_state
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.bind((HOST, PORT))
-    server.listen(1)
-    print("Waiting for PC...")
-    conn, addr = server.accept()
-    print("PC connected:", addr)
-
-    while True:
-        try:
-            data = conn.recv(1024).decode()
-            if not data:
-                print("PC disconnected.")
-                ui_state = "talking"
-                tts_speak("Goodbye everyone, I hope you enjoyed the exploration.")
-                ui_state = "idle"
-                break
-
-            if data.startswith("AI:"):
-                ui_state = "talking"
-                tts_speak(data[3:])
-                ui_state = "idle"
-
-            elif data == "GET_FRAME":
-                while speaking_flag.is_set():
-                    time.sleep(0.05)
-
-                cam.grab()
-                ret, frame = cam.read()
-                if not ret:
-                    continue
-
-                frame = cv2.resize(frame, (320, 240))
-                _, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
-                payload = pickle.dumps(buffer)
-                conn.sendall(struct.pack("L", len(payload)) + payload)
-
-        except Exception as e:
-            print("ERROR:", e)
-            ui_state = "talking"
-            tts_speak("Goodbye everyone, I hope you enjoyed the exploration.")
-            ui_state = "idle"
-            time.sleep(1)
-            break
-
-threading.Thread(target=socket_thread, daemon=True).start()
 
 # ---------------- MAIN LOOP ----------------
 running = True
@@ -239,6 +405,10 @@ while running:
     dt = now - last
     last = now
 
+    if boot.failed("camera"):
+        print(f"No camera found at {CAM_INDEX}")
+        running = False
+
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
@@ -0,0 +1,162 @@
+import os
+
+# Cards are followed by this marker so a live report can grow one card at a
+# time instead of being rewritten every frame.
+CARDS_END = "<!-- cards end -->"
+TAIL_BYTES = 64 * 1024    # how far from the end append_report looks for the marker
+
+
+def report_card(item, resolve=None):
+    # resolve maps a frame name to its path in the mission (see framestore.py)
+    resolve = resolve or (lambda name: f"frames/{name}")
+    return f"""
+        <div class="card">
+            <img src="{resolve(item['image'])}">
+            <p>{item['thought']}</p>
+        </div>
+        """
+
+
+# ================== REPORT SYSTEM (UPDATED UI) ==================
+def write_report(report_path, mission_id, log, final_text=None, resolve=None):
+    """Write the whole report; log may be a generator streaming the journal."""
+    html = f"""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<title>AI Exploration Report</title>
+<style>
+* {{
+    box-sizing: border-box;
+    font-family: "Segoe UI", Arial, sans-serif;
+}}
+
+body {{
+    margin: 0;
+    background: #f4f7fb;
+    color: #1a1a1a;
+}}
+
+header {{
+    background: white;
+    border-bottom: 3px solid #1e90ff;
+    display: flex;
+    align-items: center;
+    padding: 15px 30px;
+}}
+
+header img {{
+    height: 50px;
+    margin-right: 15px;
+}}
+
+header h1 {{
+    color: #1e90ff;
+    margin: 0;
+}}
+
+.container {{
+    width: 90%;
+    max-width: 1100px;
+    margin: 30px auto;
+}}
+
+.card {{
+    background: white;
+    border-left: 5px solid #1e90ff;
+    border-radius: 10px;
+    padding: 15px;
+    margin-bottom: 20px;
+    box-shadow: 0 4px 10px rgba(0,0,0,0.08);
+    display: flex;
+    gap: 15px;
+    align-items: center;
+}}
+
+.card img {{
+    width: 220px;
+    border-radius: 8px;
+}}
+
+.map {{
+    background: white;
+    border-radius: 10px;
+    padding: 15px;
+    margin-bottom: 20px;
+    box-shadow: 0 4px 10px rgba(0,0,0,0.08);
+    text-align: center;
+}}
+
+.map img {{
+    max-width: 100%;
+}}
+
+.final {{
+    background: #1e90ff;
+    color: white;
+    padding: 25px;
+    border-radius: 12px;
+    margin-top: 40px;
+    box-shadow: 0 4px 15px rgba(0,0,0,0.2);
+}}
+</style>
+</head>
+<body>
+
+<header>
+    <img src="../logo.jpg">
+    <h1>AI Exploration Report</h1>
+</header>
+
+<div class="container">
+    <p><b>Mission ID:</b> {mission_id}</p>
+"""
+
+    map_path = os.path.join(os.path.dirname(report_path), "map.png")
+    if os.path.exists(map_path):
+        html += """
+        <div class="map">
+            <h2>Explored Area</h2>
+            <img src="map.png">
+        </div>
+        """
+
+    tail = CARDS_END
+    if final_text:
+        tail += f"""
+        <div class="final">
+            <h2>Final Reflection</h2>
+            <p>{final_text}</p>
+        </div>
+        """
+
+    tail += """
+</div>
+</body>
+</html>
+"""
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(html)
+        for item in log:
+            f.write(report_card(item, resolve))
+        f.write(tail)
+
+
+def append_report(report_path, item, resolve=None):
+    """Insert one card after the last one, False if the report has to be written whole."""
+    try:
+        with open(report_path, "r+b") as f:
+            size = f.seek(0, os.SEEK_END)
+            start = max(0, size - TAIL_BYTES)
+            f.seek(start)
+            tail = f.read()
+            at = tail.rfind(CARDS_END.encode())
+            if at < 0:
+                return False
+            f.seek(start + at)
+            f.write(report_card(item, resolve).encode("utf-8") + tail[at:])
+        return True
+    except FileNotFoundError:
+        return False
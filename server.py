@@ -1,13 +1,263 @@
 from http.server import SimpleHTTPRequestHandler, HTTPServer
 import os
+import html as html_text
+import io
+import json
+import mimetypes
+import shutil
+import struct
+import threading
+import zipfile
+from collections import OrderedDict
 from urllib.parse import parse_qs, unquote
 
 PORT = 8080
 BASE = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_HANDLES = 8       # zip files kept open between requests
+REPORT_PAGE = 50          # decisions per report page
+TIMELINE_STEPS = 20       # jump links in the report timeline
+
+# ---------- ARCHIVED MISSIONS ----------
+
+class ArchiveCache:
+    """Small LRU of open ZipFiles, so each request only seeks to one member."""
+
+    def __init__(self, size):
+        self.size = size
+        self.handles = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        mtime = os.path.getmtime(path)
+        with self.lock:
+            entry = self.handles.pop(path, None)
+            if entry and entry[0] != mtime:
+                entry[1].close()
+                entry = None
+            if entry is None:
+                entry = (mtime, zipfile.ZipFile(path))
+            self.handles[path] = entry
+            while len(self.handles) > self.size:
+                _, (_, old) = self.handles.popitem(last=False)
+                old.close()
+            return entry[1]
+
+archives = ArchiveCache(ARCHIVE_HANDLES)
+
+def split_archive(rel):
+    """'mission_x.zip/frames/a.jpg' -> ('mission_x.zip', 'frames/a.jpg'), else None."""
+    head, _, member = rel.strip("/").partition("/")
+    if head.endswith(".zip") and os.path.isfile(os.path.join(BASE, head)):
+        return head, member
+    return None
+
+# ---------- DEDUPLICATED FRAMES ----------
+# Missions recorded with framestore.py keep frames as blobs/<sha1>.jpg and
+# index.jsonl maps frame_NNN.jpg to them.
+
+class FrameIndexCache:
+    """Frame name -> blob per mission, read incrementally while index.jsonl grows.
+
+    An archived index never changes (its key holds the zip's mtime), so with
+    final=True it is read once and the member is not reopened afterwards:
+    seeking back into a ZipExtFile rereads it from the start.
+    """
+
+    def __init__(self):
+        self.indexes = {}
+        self.lock = threading.Lock()
+
+    def lookup(self, key, opener, name, final=False):
+        with self.lock:
+            offset, blobs, done = self.indexes.setdefault(key, (0, {}, False))
+            if done:
+                return blobs.get(name)
+            try:
+                with opener() as f:
+                    f.seek(offset)
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break       # still being written
+                        offset += len(line)
+                        try:
+                            entry = json.loads(line)
+                            blobs[entry["image"]] = entry["blob"]
+                        except (ValueError, KeyError):
+                            continue
+            except (OSError, KeyError):
+                pass
+            self.indexes[key] = (offset, blobs, final)
+            return blobs.get(name)
+
+frame_indexes = FrameIndexCache()
+
+def split_frame(rel):
+    """'mission_x/frames/frame_001.jpg' -> ('mission_x', 'frame_001.jpg'), else None."""
+    parts = rel.strip("/").split("/")
+    if len(parts) >= 2 and parts[-2] == "frames":
+        return "/".join(parts[:-2]), parts[-1]
+    return None
+
+def member_info(zf, name):
+    try:
+        return zf.getinfo(name)
+    except KeyError:
+        return None
+
+class StoredMember(io.RawIOBase):
+    """An uncompressed zip member read straight from the archive file.
+
+    ZipExtFile.seek() goes backwards by rereading the member from its start,
+    which makes bisecting a journal linear in its size; a stored member is
+    just a byte range, so here seeking is free.
+    """
+
+    def __init__(self, path, info):
+        self.f = open(path, "rb")
+        self.f.seek(info.header_offset)
+        header = self.f.read(zipfile.sizeFileHeader)
+        name_len, extra_len = struct.unpack("<HH", header[26:30])
+        self.start = info.header_offset + zipfile.sizeFileHeader + name_len + extra_len
+        self.size = info.file_size
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.pos, io.SEEK_END: self.size}[whence]
+        self.pos = max(0, base + pos)
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def readinto(self, buffer):
+        n = max(0, min(len(buffer), self.size - self.pos))
+        self.f.seek(self.start + self.pos)
+        n = self.f.readinto(memoryview(buffer)[:n])
+        self.pos += n
+        return n
+
+    def close(self):
+        self.f.close()
+        super().close()
+
+def mission_has(rel, name):
+    if rel.endswith(".zip") and os.path.isfile(os.path.join(BASE, rel)):
+        return member_info(archives.get(os.path.join(BASE, rel)), name) is not None
+    return os.path.isfile(os.path.join(BASE, rel, name))
+
+def open_mission_file(rel, name):
+    """(binary file, size) for a file of a mission folder or archive, or None."""
+    if rel.endswith(".zip") and os.path.isfile(os.path.join(BASE, rel)):
+        zf = archives.get(os.path.join(BASE, rel))
+        info = member_info(zf, name)
+        if info is None:
+            return None
+        if info.compress_type == zipfile.ZIP_STORED:
+            return io.BufferedReader(StoredMember(zf.filename, info)), info.file_size
+        return zf.open(info), info.file_size
+    path = os.path.join(BASE, rel, name)
+    if os.path.isfile(path):
+        return open(path, "rb"), os.path.getsize(path)
+    return None
+
+# ---------- JOURNAL PAGING ----------
+# Reports are rendered from journal.jsonl a page at a time. A cursor is the
+# byte offset of the next line, so a page costs the same on frame 10 and
+# frame 10000, and decisions are appended in frame order, so a frame number
+# is found by bisecting the file.
+
+def parse_line(line):
+    if not line.endswith(b"\n"):
+        return None         # torn or still being written
+    try:
+        return json.loads(line)
+    except ValueError:
+        return {}
+
+def decision_at(f, pos, size):
+    """(offset, entry) of the first decision starting at or after pos, entry None if there is none.
+
+    Caption and reflection runs are read through however long they are: stopping
+    early would make bisect_journal take a frame in the middle of the file for
+    the end of it.
+    """
+    if pos:
+        f.seek(pos - 1)
+        pos += len(f.readline()) - 1
+    else:
+        f.seek(0)
+    while pos < size:
+        line = f.readline()
+        entry = parse_line(line)
+        if entry is None:
+            break
+        if "frame" in entry and "type" not in entry:
+            return pos, entry
+        pos += len(line)
+    return pos, None
+
+def bisect_journal(f, size, past):
+    """Smallest offset whose next decision satisfies past(entry) (no decision left counts as past)."""
+    lo, hi = 0, size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        entry = decision_at(f, mid, size)[1]
+        if entry is None or past(entry):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+def frame_offset(f, size, frame):
+    lo = bisect_journal(f, size, lambda e: e["frame"] >= frame)
+    return decision_at(f, lo, size)[0]
+
+def last_frame(f, size):
+    end = bisect_journal(f, size, lambda e: False)
+    start = max(0, end - 64 * 1024)
+    f.seek(start)
+    last = 0
+    for line in f.read(end - start + 64 * 1024).splitlines(keepends=True)[1 if start else 0:]:
+        entry = parse_line(line)
+        if entry and "frame" in entry and "type" not in entry:
+            last = entry["frame"]
+    return last
+
+def query_int(qs, name, default):
+    """Integer query parameter, None when it is not a number."""
+    try:
+        return int(qs.get(name, [default])[0] or default)
+    except ValueError:
+        return None
+
+def read_page(f, size, cursor, limit):
+    """Up to limit decisions from cursor, plus reflections, and the next cursor (None at the end)."""
+    f.seek(cursor)
+    entries = []
+    decisions = 0
+    while decisions < limit and cursor < size:
+        line = f.readline()
+        entry = parse_line(line)
+        if entry is None:
+            break
+        cursor += len(line)
+        if "type" not in entry and "frame" in entry:
+            decisions += 1
+            entries.append(entry)
+        elif entry.get("type") == "reflection":
+            entries.append(entry)
+    return entries, (cursor if cursor < size else None)
 
 class RobotHandler(SimpleHTTPRequestHandler):
 
     def do_GET(self):
+        archive = split_archive(unquote(self.path.split("?", 1)[0]))
         if self.path == "/":
             self.send_login()
         elif self.path == "/missions":
@@ -16,9 +266,28 @@ class RobotHandler(SimpleHTTPRequestHandler):
             self.browse_folder()
         elif self.path == "/logout":
             self.redirect("/")
+        elif self.path.startswith("/report/page?"):
+            self.send_report_page()
+        elif self.path.startswith("/report?"):
+            self.send_report()
+        elif archive:
+            self.send_archive_member(*archive)
         else:
+            self.resolve_frame()
             super().do_GET()
 
+    def resolve_frame(self):
+        """Point a missing frames/frame_NNN.jpg at its blob in the frame store."""
+        rel = unquote(self.path.split("?", 1)[0])
+        frame = split_frame(rel)
+        if not frame or os.path.exists(os.path.join(BASE, rel.strip("/"))):
+            return
+        mission, name = frame
+        index = os.path.join(BASE, mission, "index.jsonl")
+        blob = frame_indexes.lookup(index, lambda: open(index, "rb"), name)
+        if blob:
+            self.path = f"/{mission}/{blob}"
+
     def do_POST(self):
         if self.path == "/login":
             length = int(self.headers.get("Content-Length", 0))
@@ -47,14 +316,25 @@ class RobotHandler(SimpleHTTPRequestHandler):
 """, login=True)
 
     def send_missions(self):
-        missions = sorted([d for d in os.listdir(BASE) if d.startswith("mission_")])
+        # archive.py writes mission_x.zip.part before the rename: only finished archives
+        missions = sorted([d for d in os.listdir(BASE) if d.startswith("mission_") and
+                           (d.endswith(".zip") or os.path.isdir(os.path.join(BASE, d)))])
 
         cards = ""
         for m in missions:
+            archived = m.endswith(".zip")
+            # missions recorded before journal.jsonl only have their static report
+            if mission_has(m, "journal.jsonl"):
+                report = f'<a href="/report?path={m}" onclick="event.stopPropagation()">📖 Open report</a>'
+            elif mission_has(m, "report.html"):
+                report = f'<a href="/{m}/report.html" onclick="event.stopPropagation()">📖 Open report</a>'
+            else:
+                report = ""
             cards += f"""
             <div class="mission-card" onclick="location.href='/browse?path={m}'">
-                <h3>{m}</h3>
-                <p>View mission data</p>
+                <h3>{m[:-4] if archived else m}</h3>
+                <p>{"📦 Archived mission" if archived else "View mission data"}</p>
+                {report}
             </div>
             """
 
@@ -74,19 +354,26 @@ class RobotHandler(SimpleHTTPRequestHandler):
 
     def browse_folder(self):
         qs = parse_qs(self.path.split("?",1)[1])
-        rel = unquote(qs.get("path", [""])[0])
+        rel = unquote(qs.get("path", [""])[0]).rstrip("/")
         path = os.path.join(BASE, rel)
+        archive = split_archive(rel)
+
+        if archive:
+            entries = self.archive_listing(*archive)
+        elif os.path.isdir(path):
+            entries = [(name, os.path.isdir(os.path.join(path, name))) for name in sorted(os.listdir(path))]
+        else:
+            entries = None
 
-        if not os.path.exists(path):
+        if entries is None:
             self.redirect("/missions")
             return
 
         items = ""
-        for name in sorted(os.listdir(path)):
-            full = os.path.join(path, name)
+        for name, is_dir in entries:
             new = f"{rel}/{name}"
 
-            if os.path.isdir(full):
+            if is_dir:
                 items += f"""
                 <div class="file-card folder" onclick="location.href='/browse?path={new}'">
                     📁 {name}
@@ -117,6 +404,146 @@ class RobotHandler(SimpleHTTPRequestHandler):
 </div>
 """)
 
+    # ---------- REPORTS ----------
+
+    def report_cards(self, rel, entries):
+        out = ""
+        for e in entries:
+            if e.get("type") == "reflection":
+                out += f"""
+                <div class="final">
+                    <h2>Final Reflection</h2>
+                    <p>{html_text.escape(e.get("text", ""))}</p>
+                </div>
+                """
+                continue
+            out += f"""
+            <div class="report-card" id="f{e['frame']}">
+                <img src="/{rel}/frames/{e['image']}" loading="lazy" width="220" height="165">
+                <div>
+                    <b>#{e['frame']} · {e.get('action', '')}</b>
+                    <small>{e.get('source', '')}</small>
+                    <p>{html_text.escape(e.get('thought', ''))}</p>
+                </div>
+            </div>
+            """
+        return out
+
+    def send_report(self):
+        qs = parse_qs(self.path.split("?", 1)[1])
+        rel = unquote(qs.get("path", [""])[0]).strip("/")
+        journal = open_mission_file(rel, "journal.jsonl")
+        if journal is None:
+            self.redirect(f"/{rel}/report.html" if mission_has(rel, "report.html") else "/missions")
+            return
+
+        f, size = journal
+        with f:
+            frame = max(1, query_int(qs, "frame", 1) or 1)   # bad input: start of the mission
+            start = frame_offset(f, size, frame) if frame > 1 else 0
+            entries, cursor = read_page(f, size, start, REPORT_PAGE)
+            total = last_frame(f, size)
+
+        steps = sorted({1 + i * total // TIMELINE_STEPS for i in range(TIMELINE_STEPS)}) if total else []
+        timeline = "".join(f'<a href="/report?path={rel}&frame={n}">{n}</a>' for n in steps)
+        earlier = ""
+        if frame > 1:
+            earlier = f'<a class="back-btn" href="/report?path={rel}&frame={max(1, frame - REPORT_PAGE)}">⬆ Earlier frames</a>'
+        has_map = open_mission_file(rel, "map.png")
+        if has_map:
+            has_map[0].close()
+        map_html = f'<div class="map"><img src="/{rel}/map.png" loading="lazy"></div>' if has_map else ""
+
+        self.html(f"Report {rel}", f"""
+<header>
+    <div class="header-left">
+        <img src="/logo.jpg">
+        <h1>{rel}</h1>
+    </div>
+    <a href="/logout" class="logout-btn">Logout</a>
+</header>
+
+<a class="back-btn" href="/missions">⬅ Back</a>
+
+<div class="report">
+    <form class="timeline" action="/report">
+        <input type="hidden" name="path" value="{rel}">
+        {timeline}
+        <input type="number" name="frame" min="1" max="{total}" placeholder="frame (1-{total})">
+    </form>
+    {map_html}
+    {earlier}
+    {self.report_cards(rel, entries)}
+    <div id="more" data-path="{rel}" data-cursor="{'' if cursor is None else cursor}"></div>
+</div>
+{REPORT_SCRIPT}
+""")
+
+    def send_report_page(self):
+        """Next cards for the infinite scroll, the cursor after them in X-Next-Cursor."""
+        qs = parse_qs(self.path.split("?", 1)[1])
+        rel = unquote(qs.get("path", [""])[0]).strip("/")
+        journal = open_mission_file(rel, "journal.jsonl")
+        if journal is None:
+            self.send_error(404)
+            return
+
+        f, size = journal
+        with f:
+            cursor = query_int(qs, "cursor", 0)
+            if cursor is None or not 0 <= cursor <= size:
+                self.send_error(400, "Bad cursor")
+                return
+            entries, cursor = read_page(f, size, cursor, REPORT_PAGE)
+        body = self.report_cards(rel, entries).encode()
+        self.send_response(200)
+        self.send_header("Content-type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Next-Cursor", "" if cursor is None else str(cursor))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # ---------- ARCHIVES ----------
+
+    def archive_listing(self, archive, prefix):
+        """Immediate children of prefix inside the zip, as (name, is_dir)."""
+        zf = archives.get(os.path.join(BASE, archive))
+        prefix = prefix + "/" if prefix else ""
+        children = {}
+        for name in zf.namelist():
+            if name.startswith(prefix) and name != prefix:
+                child, sep, _ = name[len(prefix):].partition("/")
+                children[child] = children.get(child, False) or bool(sep)
+        if prefix and not children:
+            return None
+        return sorted(children.items())
+
+    def send_archive_member(self, archive, member):
+        if not member:
+            self.redirect(f"/browse?path={archive}")
+            return
+        path = os.path.join(BASE, archive)
+        zf = archives.get(path)
+        info = member_info(zf, member)
+        frame = split_frame(member)
+        if info is None and frame:
+            mission, name = frame
+            prefix = mission + "/" if mission else ""
+            blob = frame_indexes.lookup((path, os.path.getmtime(path), mission),
+                                        lambda: zf.open(prefix + "index.jsonl"), name, final=True)
+            info = member_info(zf, prefix + blob) if blob else None
+        if info is None:
+            self.send_error(404, "Not in archive")
+            return
+
+        ctype = mimetypes.guess_type(member)[0] or "application/octet-stream"
+        self.send_response(200)
+        self.send_header("Content-type", ctype)
+        self.send_header("Content-Length", str(info.file_size))
+        self.end_headers()
+        with zf.open(info) as src:
+            shutil.copyfileobj(src, self.wfile, 64 * 1024)
+
     # ---------- HTML FRAME ----------
 
     def html(self, title, body, login=False):
@@ -243,6 +670,76 @@ button {{
 }}
 
 .error {{ color:red; }}
+
+.report {{
+    width:90%;
+    max-width:1100px;
+    margin:0 auto 30px;
+}}
+
+.report-card {{
+    background:white;
+    border-left:5px solid #1e90ff;
+    border-radius:10px;
+    padding:15px;
+    margin-bottom:20px;
+    box-shadow:0 4px 10px rgba(0,0,0,0.08);
+    display:flex;
+    gap:15px;
+    align-items:center;
+}}
+
+.report-card img {{
+    border-radius:8px;
+    object-fit:contain;
+    background:#ddd;
+}}
+
+.report-card small {{
+    color:#888;
+    margin-left:8px;
+}}
+
+.timeline {{
+    display:flex;
+    flex-wrap:wrap;
+    gap:8px;
+    align-items:center;
+    margin:20px 0;
+}}
+
+.timeline a {{
+    padding:4px 10px;
+    background:white;
+    border-radius:12px;
+    color:#1e90ff;
+    text-decoration:none;
+}}
+
+.timeline input {{
+    width:140px;
+    margin:0;
+}}
+
+.map {{
+    background:white;
+    border-radius:10px;
+    padding:15px;
+    margin-bottom:20px;
+    text-align:center;
+}}
+
+.final {{
+    background:#1e90ff;
+    color:white;
+    padding:25px;
+    border-radius:12px;
+    margin-top:40px;
+}}
+
+.final h2 {{
+    color:white;
+}}
 </style>
 </head>
 <body>
@@ -256,6 +753,25 @@ button {{
         self.send_header("Location", loc)
         self.end_headers()
 
+# Loads the next page when the end of the list scrolls into view
+REPORT_SCRIPT = """
+<script>
+const more = document.getElementById("more");
+const observer = new IntersectionObserver(async (entries) => {
+    if (!entries[0].isIntersecting || !more.dataset.cursor || more.dataset.busy) return;
+    more.dataset.busy = "1";
+    const r = await fetch("/report/page?path=" + encodeURIComponent(more.dataset.path)
+                          + "&cursor=" + more.dataset.cursor);
+    more.insertAdjacentHTML("beforebegin", await r.text());
+    more.dataset.cursor = r.headers.get("X-Next-Cursor") || "";
+    delete more.dataset.busy;
+    observer.unobserve(more);
+    if (more.dataset.cursor) observer.observe(more);
+}, {rootMargin: "800px"});
+observer.observe(more);
+</script>
+"""
+
 # ---------- RUN ----------
 os.chdir(BASE)
 print(f"Server running → http://localhost:{PORT}")
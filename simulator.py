@@ -0,0 +1,460 @@
+import socket
+import struct
+import pickle
+import threading
+import argparse
+import json
+import math
+import random
+import re
+import time
+
+import cv2
+import numpy as np
+
+import motion
+from telemetry import pack_telemetry, MOTION_STATES, TELEMETRY_PERIOD
+
+# ================== CONFIG ==================
+HOST = "127.0.0.1"
+PI_PORT = 8000
+ESP_PORT = 9000
+
+FRAME_W = 320             # same size raspi.py sends
+FRAME_H = 240
+FOV_DEG = 60
+WALL_HEIGHT_CM = 60
+JPEG_QUALITY = 90
+
+SONAR_RANGE_CM = 400
+SONAR_CONE_DEG = 15
+COVERAGE_CELL_CM = 20
+ESCAPE_COOLDOWN = 3       # seconds, same as esp.py
+STATS_EVERY = 10          # wall-clock seconds between stat lines
+
+# 5 m x 4 m room with a table and a box, polygons in cm
+DEFAULT_ROOM = [
+    [[0, 0], [500, 0], [500, 400], [0, 400]],
+    [[150, 120], [230, 120], [230, 180], [150, 180]],
+    [[330, 250], [380, 250], [380, 320], [330, 320]],
+]
+
+PALETTE = np.array([
+    [200, 180, 160], [170, 200, 210], [150, 150, 220],
+    [120, 200, 140], [210, 150, 120], [190, 190, 190],
+], dtype=np.float32)
+
+
+# ================== WORLD ==================
+class World:
+    """Static walls as line segments, with vectorized ray casting."""
+
+    def __init__(self, polygons):
+        segs = []
+        for poly in polygons:
+            for i in range(len(poly)):
+                (x1, y1), (x2, y2) = poly[i], poly[(i + 1) % len(poly)]
+                segs.append((x1, y1, x2, y2))
+        segs = np.array(segs, dtype=np.float64)
+        self.ax = segs[:, 0]
+        self.ay = segs[:, 1]
+        self.sx = segs[:, 2] - segs[:, 0]
+        self.sy = segs[:, 3] - segs[:, 1]
+        self.seg_len = np.hypot(self.sx, self.sy)
+
+        outer = np.array(polygons[0], dtype=np.float64)
+        self.min_x, self.min_y = outer.min(axis=0)
+        self.max_x, self.max_y = outer.max(axis=0)
+
+    def cast(self, x, y, angles):
+        """Distance, wall index and position along the wall for each ray."""
+        angles = np.atleast_1d(angles)
+        dx = np.cos(angles)[:, None]
+        dy = np.sin(angles)[:, None]
+        qx = self.ax - x
+        qy = self.ay - y
+        denom = dx * self.sy - dy * self.sx
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (qx * self.sy - qy * self.sx) / denom
+            u = (qx * dy - qy * dx) / denom
+        valid = (np.abs(denom) > 1e-9) & (t > 1e-6) & (u >= 0) & (u <= 1)
+        t = np.where(valid, t, np.inf)
+
+        idx = t.argmin(axis=1)
+        rows = np.arange(len(angles))
+        dist = t[rows, idx]
+        along = np.where(valid[rows, idx], u[rows, idx], 0.0) * self.seg_len[idx]
+        return dist, idx, along
+
+    def inside(self, px, py):
+        """Even-odd test: True for points in the room and outside obstacles."""
+        px = np.asarray(px, dtype=np.float64)[:, None]
+        py = np.asarray(py, dtype=np.float64)[:, None]
+        by = self.ay + self.sy
+        crosses = (self.ay > py) != (by > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_at = self.ax + (py - self.ay) * self.sx / self.sy
+        return (crosses & (px < x_at)).sum(axis=1) % 2 == 1
+
+
+# ================== CAMERA ==================
+class Renderer:
+    """First-person column renderer, all buffers allocated once."""
+
+    def __init__(self, world, width=FRAME_W, height=FRAME_H, fov=FOV_DEG):
+        self.world = world
+        self.width = width
+        self.height = height
+        self.offsets = np.radians(np.linspace(fov / 2, -fov / 2, width))
+        self.cos_offsets = np.cos(self.offsets)
+        self.focal = (width / 2) / math.tan(math.radians(fov / 2))
+        self.rows = np.arange(height, dtype=np.float64)[:, None]
+
+        # ceiling on top, floor getting lighter towards the robot
+        self.background = np.empty((height, width, 3), dtype=np.uint8)
+        self.background[: height // 2] = (70, 60, 55)
+        ramp = np.linspace(60, 140, height - height // 2)[:, None, None]
+        self.background[height // 2:] = (ramp * np.array([1.0, 1.0, 1.1])).astype(np.uint8)
+        self.frame = np.empty_like(self.background)
+
+    def render(self, x, y, heading):
+        dist, idx, along = self.world.cast(x, y, math.radians(heading) + self.offsets)
+        perp = np.maximum(dist * self.cos_offsets, 1.0)
+        half = self.focal * WALL_HEIGHT_CM / perp / 2
+        mask = (self.rows >= self.height / 2 - half) & (self.rows < self.height / 2 + half)
+
+        shade = np.clip(1.2 - perp / 600, 0.25, 1.0)
+        stripe = np.where((along // 25) % 2 == 0, 1.0, 0.8)
+        colors = (PALETTE[idx % len(PALETTE)] * (shade * stripe)[:, None]).astype(np.uint8)
+
+        np.copyto(self.frame, self.background)
+        np.copyto(self.frame, np.broadcast_to(colors, self.frame.shape), where=mask[:, :, None])
+        return self.frame
+
+    def jpeg(self, x, y, heading):
+        _, buffer = cv2.imencode(".jpg", self.render(x, y, heading),
+                                 [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        return buffer
+
+
+# ================== ROBOT ==================
+class Simulation:
+    """Robot pose, ESP behaviour and mission statistics, in simulated time."""
+
+    def __init__(self, world, start=None, heading=90.0, seed=0):
+        self.world = world
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+        if start is None:
+            start = ((world.min_x + world.max_x) / 2, (world.min_y + world.max_y) / 2)
+        self.x, self.y = start
+        self.heading = heading
+        self.state = "IDLE"
+        self.emergency = False
+
+        self.sim_time = 0.0
+        self.last_escape = -ESCAPE_COOLDOWN
+        self.commands = 0
+        self.frames = 0
+        self.collisions = 0
+        self.escapes = 0
+        self.started = time.time()
+
+        cols = int(math.ceil((world.max_x - world.min_x) / COVERAGE_CELL_CM))
+        rows = int(math.ceil((world.max_y - world.min_y) / COVERAGE_CELL_CM))
+        cx = world.min_x + (np.arange(cols) + 0.5) * COVERAGE_CELL_CM
+        cy = world.min_y + (np.arange(rows) + 0.5) * COVERAGE_CELL_CM
+        gx, gy = np.meshgrid(cx, cy)
+        self.free = world.inside(gx.ravel(), gy.ravel()).reshape(rows, cols)
+        self.visited = np.zeros_like(self.free)
+        self._mark()
+
+    # ---------- sensors ----------
+    def sonar(self):
+        cone = np.radians(np.linspace(-SONAR_CONE_DEG / 2, SONAR_CONE_DEG / 2, 5))
+        dist, _, _ = self.world.cast(self.x, self.y, math.radians(self.heading) + cone)
+        d = float(dist.min()) - motion.ROBOT_RADIUS_CM + self.rng.gauss(0, 0.5)
+        if d > SONAR_RANGE_CM:
+            return None
+        return max(d, 2.0)
+
+    # ---------- motion ----------
+    def _mark(self):
+        col = int((self.x - self.world.min_x) // COVERAGE_CELL_CM)
+        row = int((self.y - self.world.min_y) // COVERAGE_CELL_CM)
+        if 0 <= row < self.visited.shape[0] and 0 <= col < self.visited.shape[1]:
+            self.visited[row, col] = True
+
+    def _clearance(self, direction):
+        """How far the body can travel along direction (radians) before touching a wall."""
+        r = motion.ROBOT_RADIUS_CM
+        nx, ny = -math.sin(direction), math.cos(direction)
+        free = min(
+            float(self.world.cast(self.x + side * r * nx, self.y + side * r * ny, direction)[0][0])
+            for side in (-0.9, 0.0, 0.9)
+        )
+        return max(0.0, free - r)
+
+    def _drive(self, distance, check_sonar):
+        direction = math.radians(self.heading) + (0 if distance >= 0 else math.pi)
+        travel = abs(distance)
+        allowed = self._clearance(direction)
+        escape = False
+
+        if check_sonar:
+            front = self.sonar()
+            if front is not None and front - travel < motion.ESCAPE_DISTANCE_CM:
+                sonar_allowed = max(0.0, front - motion.ESCAPE_DISTANCE_CM)
+                if sonar_allowed <= allowed:
+                    allowed = sonar_allowed
+                    escape = True
+
+        if travel > allowed:
+            travel = allowed
+            if not escape:
+                self.collisions += 1
+
+        steps = max(1, int(travel // 5))
+        for _ in range(steps):
+            self.x += travel / steps * math.cos(direction)
+            self.y += travel / steps * math.sin(direction)
+            self._mark()
+        return escape
+
+    def _turn(self, degrees):
+        self.heading = (self.heading + degrees) % 360
+
+    def _escape(self):
+        self.escapes += 1
+        self.emergency = True
+        self.last_escape = self.sim_time
+        back, turn, duration = motion.escape_delta()
+        self._drive(back, check_sonar=False)
+        self._turn(turn)
+        self.sim_time += duration
+        # stays set until the ESP stand-in has shown it in telemetry
+
+    def step(self, action):
+        """Apply one ESP command, return its simulated duration."""
+        with self.lock:
+            self.commands += 1
+            self.emergency = False
+            distance, turn, duration = motion.action_delta(action)
+            escape = False
+            if distance:
+                escape = self._drive(distance, check_sonar=distance > 0)
+            self._turn(turn)
+            self.sim_time += duration
+
+            # esp.py keeps watching the sonar even when idle
+            front = self.sonar()
+            cooled = self.sim_time - self.last_escape > ESCAPE_COOLDOWN
+            if escape or (front is not None and front < motion.ESCAPE_DISTANCE_CM and cooled):
+                self._escape()
+            return duration
+
+    # ---------- stats ----------
+    def stats(self):
+        wall = max(time.time() - self.started, 1e-9)
+        minutes = max(self.sim_time / 60, 1e-9)
+        coverage = (self.visited & self.free).sum() / max(self.free.sum(), 1)
+        return {
+            "commands": self.commands,
+            "frames": self.frames,
+            "sim_minutes": self.sim_time / 60,
+            "speedup": self.sim_time / wall,
+            "decisions_per_s": self.commands / wall,
+            "collisions": self.collisions,
+            "collisions_per_min": self.collisions / minutes,
+            "escapes": self.escapes,
+            "coverage": coverage,
+            "coverage_per_min": coverage / minutes,
+        }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"[SIM] {s['commands']} cmds, {s['frames']} frames, "
+              f"{s['sim_minutes']:.1f} sim-min (x{s['speedup']:.1f}), "
+              f"{s['decisions_per_s']:.2f} decisions/s, "
+              f"{s['collisions']} collisions ({s['collisions_per_min']:.2f}/min), "
+              f"{s['escapes']} escapes, coverage {s['coverage']:.1%} "
+              f"({s['coverage_per_min']:.2%}/min)")
+
+
+# ================== PI STAND-IN ==================
+def serve_pi(sim, renderer, host, port, drop_every=0):
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen(1)
+    print(f"Simulated Pi on {host}:{port}")
+
+    while True:
+        conn, addr = server.accept()
+        print("PC connected to Pi:", addr)
+        served = 0
+        try:
+            while True:
+                data = conn.recv(1024)
+                if not data:
+                    break
+                # AI:<thought> text may arrive glued to the next request
+                for _ in range(data.count(b"GET_FRAME")):
+                    with sim.lock:
+                        buffer = renderer.jpeg(sim.x, sim.y, sim.heading)
+                        sim.frames += 1
+                    payload = pickle.dumps(buffer)
+                    conn.sendall(struct.pack("L", len(payload)) + payload)
+                    served += 1
+                # induced Wi-Fi drop, for reconnect testing
+                if drop_every and served >= drop_every:
+                    print("Dropping Pi link")
+                    break
+        except OSError as e:
+            print("Pi link error:", e)
+        conn.close()
+        print("PC disconnected from Pi.")
+
+
+# ================== ESP STAND-IN ==================
+def serve_esp(sim, host, port, time_scale, drop_every=0):
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen(1)
+    print(f"Simulated ESP32 on {host}:{port}")
+    pattern = re.compile("|".join(motion.ACTIONS))
+
+    while True:
+        conn, addr = server.accept()
+        print("PC connected to ESP:", addr)
+        connected = threading.Event()
+        connected.set()
+
+        def telemetry_loop():
+            seq = 0
+            while connected.is_set():
+                with sim.lock:
+                    packet = pack_telemetry(seq, sim.sonar(), MOTION_STATES.index(sim.state),
+                                            sim.emergency, int(sim.sim_time * 1000))
+                try:
+                    conn.sendall(packet)
+                except OSError:
+                    break
+                seq += 1
+                time.sleep(TELEMETRY_PERIOD)
+
+        threading.Thread(target=telemetry_loop, daemon=True).start()
+        handled = 0
+        try:
+            while True:
+                data = conn.recv(64)
+                if not data:
+                    break
+                for action in pattern.findall(data.decode(errors="ignore").upper()):
+                    handled += 1
+                    duration = sim.step(action)
+                    if time_scale > 0:
+                        # report the motion in telemetry while the command "runs"
+                        sim.state = action if action in MOTION_STATES else "IDLE"
+                        time.sleep(duration / time_scale)
+                        sim.state = "IDLE"
+                    if sim.emergency:
+                        # the real ESP is busy in escape_routine for a while; keep it
+                        # visible for at least two packets even at --time-scale 0
+                        sim.state = "ESCAPE"
+                        hold = motion.escape_delta()[2] / time_scale if time_scale > 0 else 0
+                        time.sleep(max(hold, 2 * TELEMETRY_PERIOD))
+                        with sim.lock:
+                            sim.emergency = False
+                            sim.state = "IDLE"
+                if drop_every and handled >= drop_every:
+                    print("Dropping ESP link")
+                    break
+        except OSError as e:
+            print("ESP link error:", e)
+        connected.clear()
+        conn.close()
+        print("PC disconnected from ESP.")
+        sim.print_stats()
+
+
+# ================== HEADLESS POLICIES ==================
+def random_policy(sim, frame):
+    return sim.rng.choices(motion.ACTIONS[:4], weights=[6, 1, 2, 2])[0]
+
+
+def reactive_policy(sim, frame):
+    front = sim.sonar()
+    if front is None or front > 40:
+        return "FORWARD"
+    return sim.rng.choice(["LEFT", "RIGHT"])
+
+
+POLICIES = {"random": random_policy, "reactive": reactive_policy}
+
+
+def run_headless(sim, renderer, steps, policy, encode=True):
+    """Drive the robot without sockets, rendering every frame like the Pi would."""
+    decide = POLICIES[policy]
+    for i in range(steps):
+        if encode:
+            frame = renderer.jpeg(sim.x, sim.y, sim.heading)
+        else:
+            frame = renderer.render(sim.x, sim.y, sim.heading)
+        sim.frames += 1
+        sim.step(decide(sim, frame))
+        if (i + 1) % 1000 == 0:
+            sim.print_stats()
+    sim.print_stats()
+    return sim.stats()
+
+
+# ================== RUN ==================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless 2D world for main.py")
+    parser.add_argument("--room", help="JSON list of polygons in cm, first one is the outer wall")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--time-scale", type=float, default=0,
+                        help="simulated seconds per real second, 0 = as fast as possible")
+    parser.add_argument("--headless", action="store_true", help="run a built-in policy, no sockets")
+    parser.add_argument("--steps", type=int, default=5000)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="reactive")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--robots", type=int, default=1,
+                        help="independent robots in the same room, robot i serves ports +i")
+    parser.add_argument("--pi-port", type=int, default=PI_PORT)
+    parser.add_argument("--esp-port", type=int, default=ESP_PORT)
+    parser.add_argument("--drop-every", type=int, default=0,
+                        help="close the Pi link every N frames and the ESP link every N+7 commands")
+    args = parser.parse_args()
+
+    room = DEFAULT_ROOM
+    if args.room:
+        with open(args.room) as f:
+            room = json.load(f)
+
+    world = World(room)
+
+    if args.headless:
+        run_headless(Simulation(world, seed=args.seed), Renderer(world), args.steps, args.policy)
+    else:
+        sims = []
+        for i in range(args.robots):
+            sim = Simulation(world, seed=args.seed + i)
+            sims.append(sim)
+            esp_drop = args.drop_every + 7 if args.drop_every else 0
+            threading.Thread(target=serve_pi, daemon=True,
+                             args=(sim, Renderer(world), args.host, args.pi_port + i,
+                                   args.drop_every)).start()
+            threading.Thread(target=serve_esp, daemon=True,
+                             args=(sim, args.host, args.esp_port + i, args.time_scale,
+                                   esp_drop)).start()
+        try:
+            while True:
+                time.sleep(STATS_EVERY)
+                for sim in sims:
+                    sim.print_stats()
+        except KeyboardInterrupt:
+            for sim in sims:
+                sim.print_stats()
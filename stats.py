@@ -0,0 +1,33 @@
+from collections import deque
+
+# ================== LATENCY STATISTICS ==================
+# Shared by fleet.py and evaluate.py
+RECENT_SAMPLES = 1000     # values kept for percentiles, the mean covers all of them
+
+
+def percentile(values, q):
+    """Nearest-rank percentile, q in 0..1; 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Latencies:
+    """Running mean over a whole run plus the last RECENT_SAMPLES values for percentiles."""
+
+    def __init__(self, size=RECENT_SAMPLES):
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=size)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.recent.append(value)
+
+    def mean(self):
+        return self.total / max(self.count, 1)
+
+    def percentile(self, q):
+        return percentile(self.recent, q)
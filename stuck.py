@@ -0,0 +1,95 @@
+from collections import deque
+
+import cv2
+import numpy as np
+
+# ================== DETECTION ==================
+HISTORY = 8               # recent actions kept
+OSCILLATION_FLIPS = 4     # e.g. LEFT RIGHT LEFT RIGHT LEFT
+STILL_FORWARDS = 2        # FORWARDs in a row with no visible change
+REPEATED_STOPS = 3        # model STOPs in a row; fallback and sensor STOPs do not count
+MIN_MOTION = 4.0          # mean grey-level change (0..255) expected after a FORWARD
+THUMB_SIZE = (80, 60)
+
+# ================== RECOVERY ==================
+# Back off and turn around, without asking the model
+RECOVERY = ["BACKWARD", "RIGHT", "RIGHT"]
+
+OPPOSITE = {"LEFT": "RIGHT", "RIGHT": "LEFT", "FORWARD": "BACKWARD", "BACKWARD": "FORWARD"}
+
+
+class StuckDetector:
+    """Spots no-progress and oscillation patterns and plays a scripted escape.
+
+    observe() every frame, record() every action sent with its source, and ask next_action()
+    before paying for an inference call.
+    """
+
+    def __init__(self):
+        self.actions = deque(maxlen=HISTORY)
+        self.recovery = deque()
+        w, h = THUMB_SIZE
+        self.thumb = np.empty((h, w), dtype=np.uint8)
+        self.prev = np.empty((h, w), dtype=np.uint8)
+        self.diff = np.empty((h, w), dtype=np.uint8)
+        self.has_prev = False
+
+        self.motion = None
+        self.still_forwards = 0
+        self.model_stops = 0
+        self.triggers = 0
+        self.avoided = 0
+
+    def observe(self, frame):
+        """Measure how much the view changed since the previous frame."""
+        small = cv2.resize(frame, THUMB_SIZE, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self.thumb)
+
+        if self.has_prev:
+            cv2.absdiff(self.thumb, self.prev, dst=self.diff)
+            self.motion = cv2.mean(self.diff)[0]
+            if self.actions and self.actions[-1] == "FORWARD":
+                self.still_forwards = self.still_forwards + 1 if self.motion < MIN_MOTION else 0
+
+        self.thumb, self.prev = self.prev, self.thumb
+        self.has_prev = True
+
+    def record(self, action, source="model"):
+        self.actions.append(action)
+        if action != "STOP":
+            self.model_stops = 0
+        elif source == "model":
+            self.model_stops += 1
+        if action != "FORWARD" and not self.recovery:
+            self.still_forwards = 0
+
+    def oscillating(self):
+        recent = list(self.actions)[-(OSCILLATION_FLIPS + 1):]
+        if len(recent) <= OSCILLATION_FLIPS:
+            return False
+        return all(OPPOSITE.get(a) == b for a, b in zip(recent, recent[1:]))
+
+    def stuck(self):
+        if self.still_forwards >= STILL_FORWARDS:
+            return "no progress"
+        if self.model_stops >= REPEATED_STOPS:
+            return "no progress"
+        if self.oscillating():
+            return "oscillation"
+        return None
+
+    def next_action(self):
+        """Return (reason, action) while a recovery maneuver is running, else None."""
+        if not self.recovery:
+            reason = self.stuck()
+            if reason is None:
+                return None
+            self.triggers += 1
+            self.recovery.extend(RECOVERY)
+            self.actions.clear()
+            self.still_forwards = 0
+            self.model_stops = 0
+        else:
+            reason = "recovering"
+        self.avoided += 1
+        return reason, self.recovery.popleft()
@@ -0,0 +1,154 @@
+import socket
+import struct
+import threading
+import time
+import math
+
+# ================== TELEMETRY FORMAT ==================
+# Keep in sync with the packing in esp.py
+# magic, seq, distance (mm), motion state, emergency flag, esp ticks (ms)
+TELEMETRY_MAGIC = b"TM"
+TELEMETRY_FMT = "<2sHHBBI"
+TELEMETRY_SIZE = struct.calcsize(TELEMETRY_FMT)
+NO_DISTANCE = 0xFFFF
+
+MOTION_STATES = ["IDLE", "FORWARD", "BACKWARD", "LEFT", "RIGHT", "ESCAPE"]
+
+TELEMETRY_PERIOD = 0.1   # seconds between packets sent by the ESP
+
+
+def pack_telemetry(seq, distance_cm, state, emergency, esp_ms):
+    if distance_cm is None:
+        dist_mm = NO_DISTANCE
+    else:
+        dist_mm = min(int(distance_cm * 10), NO_DISTANCE - 1)
+    return struct.pack(TELEMETRY_FMT, TELEMETRY_MAGIC, seq & 0xFFFF, dist_mm,
+                       state, 1 if emergency else 0, esp_ms & 0xFFFFFFFF)
+
+
+def unpack_telemetry(packet):
+    _, seq, dist_mm, state, emergency, esp_ms = struct.unpack(TELEMETRY_FMT, packet)
+    return {
+        "seq": seq,
+        "distance": None if dist_mm == NO_DISTANCE else dist_mm / 10.0,
+        "state": MOTION_STATES[state] if state < len(MOTION_STATES) else "IDLE",
+        "emergency": bool(emergency),
+        "esp_ms": esp_ms,
+        "received_at": time.time(),
+    }
+
+
+# ================== LATEST VALUE STORE ==================
+class TelemetryStore:
+    """Keeps only the most recent reading; readers never block the socket thread."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latest = None
+        self.received = 0
+        self.dropped = 0
+
+    def update(self, reading):
+        with self.lock:
+            self.latest = reading
+            self.received += 1
+
+    def reset(self):
+        with self.lock:
+            self.latest = None
+
+    def age(self):
+        """Seconds since the last packet, None if nothing arrived yet."""
+        with self.lock:
+            reading = self.latest
+        if reading is None:
+            return None
+        return time.time() - reading["received_at"]
+
+    def get(self, max_age=None):
+        with self.lock:
+            reading = self.latest
+        if reading is None:
+            return None
+        if max_age is not None and time.time() - reading["received_at"] > max_age:
+            return None
+        return reading
+
+
+def parse_stream(buffer, store):
+    """Consume every complete packet in buffer, return the unparsed tail."""
+    while True:
+        start = buffer.find(TELEMETRY_MAGIC)
+        if start < 0:
+            # keep a trailing byte, it may be the first half of the magic
+            if buffer:
+                store.dropped += len(buffer) - 1
+            return buffer[-1:]
+        if start:
+            store.dropped += start
+        if len(buffer) - start < TELEMETRY_SIZE:
+            return buffer[start:]
+        store.update(unpack_telemetry(buffer[start:start + TELEMETRY_SIZE]))
+        buffer = buffer[start + TELEMETRY_SIZE:]
+
+
+def start_reader(sock, store):
+    """Read telemetry packets from the ESP socket in a background thread."""
+
+    def reader():
+        buffer = b""
+        while True:
+            try:
+                chunk = sock.recv(256)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if not chunk:
+                break
+            buffer = parse_stream(buffer + chunk, store)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    return thread
+
+
+# ================== FAKE ESP ==================
+# Run `python telemetry.py` and point main.py's ESP_IP at this machine to
+# exercise the telemetry path without the robot.
+def fake_esp(port=9000):
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("", port))
+    server.listen(1)
+    print("Fake ESP waiting for PC on port", port)
+    conn, addr = server.accept()
+    print("PC connected:", addr)
+    conn.settimeout(TELEMETRY_PERIOD)
+
+    seq = 0
+    state = 0
+    start = time.time()
+    while True:
+        t = time.time() - start
+        # synthetic wall approaching and receding, dips under 15 cm every ~20 s
+        distance = 60 + 50 * math.sin(t * 2 * math.pi / 20)
+        try:
+            conn.sendall(pack_telemetry(seq, distance, state, distance < 15,
+                                        int(t * 1000)))
+            data = conn.recv(64)
+            if not data:
+                break
+            cmd = data.decode().strip().upper()
+            print(f"CMD: {cmd}  (distance {distance:.1f} cm)")
+            state = MOTION_STATES.index(cmd) if cmd in MOTION_STATES else 0
+        except socket.timeout:
+            pass
+        except OSError:
+            break
+        seq += 1
+    print("PC disconnected.")
+
+
+if __name__ == "__main__":
+    fake_esp()